@@ -8,11 +8,17 @@
 
 # All these have an __all__ so rely on that
 from epicsdbbuilder.const_array import *  # noqa: F403
+from epicsdbbuilder.context import *  # noqa: F403
 from epicsdbbuilder.dbd import *  # noqa: F403
+from epicsdbbuilder.dbreader import *  # noqa: F403
 from epicsdbbuilder.fanout import *  # noqa: F403
+from epicsdbbuilder.linkgraph import *  # noqa: F403
+from epicsdbbuilder.parallel import *  # noqa: F403
 from epicsdbbuilder.parameter import *  # noqa: F403
+from epicsdbbuilder.profiling import *  # noqa: F403
 from epicsdbbuilder.recordbase import *  # noqa: F403
 from epicsdbbuilder.recordnames import *  # noqa: F403
 from epicsdbbuilder.recordset import *  # noqa: F403
+from epicsdbbuilder.transfer import *  # noqa: F403
 
 from ._version import __version__ as __version__
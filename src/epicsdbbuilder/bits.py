@@ -6,6 +6,8 @@ from .dbd import records
 
 def Extend_mbbiDirect(mbbiDirect):  # noqa: N803 Keep the EPICS format of the record name
     class mbbiDirect(mbbiDirect):
+        __slots__ = ()
+
         def bit(self, offset):
             return _Bits(self, BIT_INPUT, records.bi, offset, 1)
 
@@ -17,6 +19,8 @@ def Extend_mbbiDirect(mbbiDirect):  # noqa: N803 Keep the EPICS format of the re
 
 def Extend_mbboDirect(mbboDirect):  # noqa: N803 Keep the EPICS format of the record name
     class mbboDirect(mbboDirect):
+        __slots__ = ()
+
         def bit(self, offset):
             return _Bits(self, BIT_OUTPUT, records.bo, offset, 1)
 
@@ -0,0 +1,34 @@
+"""Isolated contexts for building databases concurrently."""
+
+import contextlib
+
+from .dbd import current_database
+from .parameter import current_parameter_names
+from .recordnames import _DefaultRecordNames, current_record_names
+from .recordset import RecordSet, current_record_set
+
+__all__ = ["DatabaseContext"]
+
+
+@contextlib.contextmanager
+def DatabaseContext(record_names=None, database=None):
+    """Within this context records are added to a new empty record set, which
+    is returned, record names are computed by record_names, or left unchanged
+    if this is None, and no parameters are defined.  If database is given then
+    records and the DBD functions use this DBDatabase.  All module level
+    functions act on this context, which is inherited by asyncio tasks created
+    within it but not by new threads."""
+    record_set = RecordSet()
+    record_names = record_names or _DefaultRecordNames
+    tokens = [
+        (current_record_set, current_record_set.set(record_set)),
+        (current_record_names, current_record_names.set([record_names])),
+        (current_parameter_names, current_parameter_names.set(set())),
+    ]
+    if database is not None:
+        tokens.append((current_database, current_database.set(database)))
+    try:
+        yield record_set
+    finally:
+        for context_var, token in reversed(tokens):
+            context_var.reset(token)
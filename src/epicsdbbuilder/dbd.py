@@ -1,94 +1,348 @@
 """Implements the set of records provided by a dbd"""
 
+import contextvars
 import ctypes
 import os
 import os.path
 import platform
-
-from . import mydbstatic  # Pick up interface to EPICS dbd files
+import re
+import threading
+from collections import OrderedDict, namedtuple
+
+from . import (  # Pick up interface to EPICS dbd files
+    dbdcache,
+    dbdparser,
+    dbverify,
+    mydbstatic,
+    profiling,
+)
 from .recordbase import Record
 
-__all__ = ["InitialiseDbd", "LoadDbdFile", "records"]
+__all__ = ["DBDatabase", "InitialiseDbd", "LoadDbdFile", "LoadDbdFiles", "records"]
 
 
-# This class contains all the record types current supported by the loaded
-# dbd, and is published to the world as epics.records.  As records are added
-# (in response to calls to LoadDbdFile) they are automatically available to
-# all targets.
+# This class contains all the record types current supported by the dbds
+# loaded into a database, and the record types of the current database are
+# published to the world as epics.records.  As records are added (in response
+# to calls to LoadDbdFile) they are automatically available to all targets.
+#
+# The record classes are only created when first used, as most builders only
+# use a handful of the record types defined by the loaded DBDs.
 class RecordTypes:
-    def __init__(self):
-        self.__RecordTypes = set()
+    def __init__(self, database=None):
+        self.__database = database
+        # Maps record type name to the on_use hook for its record class
+        self.__RecordTypes = {}
+        self.__Validators = []
 
     def GetRecords(self):
         return sorted(self.__RecordTypes)
 
-    def _PublishRecordType(self, on_use, record_type, validate):
-        # Publish this record type as a method
-        self.__RecordTypes.add(record_type)
-        setattr(self, record_type, Record.CreateSubclass(on_use, record_type, validate))
+    def _PublishRecordType(self, on_use, record_type):
+        # Publish this record type, the class is created on first access
+        self.__RecordTypes[record_type] = on_use
+
+    # Called for record types that have not yet been accessed: creates the
+    # record class and publishes it as an attribute.
+    def __getattr__(self, record_type):
+        try:
+            if record_type.startswith("_"):
+                raise KeyError(record_type)
+            on_use = self.__RecordTypes[record_type]
+        except KeyError:
+            raise AttributeError(f"Unknown record type {record_type}") from None
+        validate = ValidateDbField(record_type, self.__database)
+        self.__Validators.append(validate)
+        record_class = Record.CreateSubclass(on_use, record_type, validate)
+        setattr(self, record_type, record_class)
+        return record_class
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self.__RecordTypes))
+
+    # Called when a DBD has been loaded: any new menu choices or device types
+    # invalidate what the validators already know.
+    def _InvalidateValidators(self):
+        for validate in self.__Validators:
+            validate.Invalidate()
 
     # Checks whether the given recordType names a known valid record type.
     def __contains__(self, record_type):
         return record_type in self.__RecordTypes
 
 
-# Every record type loaded from a DBD is present as an attribute of this
-# class with the name of the record type.
-#
-# For example, to create an ai record, simply write
-#
-#   records.ai('NAME', DESC = 'A test ai record', EGU = 'V')
-#
-records = RecordTypes()
+# Metadata for a single field of a record type as extracted from the DBD.  The
+# index is the position of the field in the DBD, dbf_type is the field type
+# name (eg "DBF_MENU"), choices is the tuple of valid choices for DBF_MENU and
+# DBF_DEVICE fields, size is the storage size of a DBF_STRING field including
+# its terminating null, and special is "SPC_CALC" for CALC expression fields.
+FieldInfo = namedtuple(
+    "FieldInfo", ["name", "index", "dbf_type", "choices", "size", "special"]
+)
+
+
+# Validation cache statistics returned by ValidateDbField.CacheInfo.
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+# Returns the list of menu or device choices for the field under the cursor, or
+# None if this is not a menu field.  The choices of a menu are the same array
+# for every field using the menu, so are only decoded once.
+def _MenuChoices(entry, menus=None):
+    count = mydbstatic.dbGetNMenuChoices(entry)
+    if count < 0:
+        return None
+    choices = mydbstatic.dbGetMenuChoices(entry)
+    if menus is None:
+        return tuple(choices[i].decode() for i in range(count) if choices[i])
+    key = (ctypes.cast(choices, ctypes.c_void_p).value, count)
+    result = menus.get(key)
+    if result is None:
+        result = tuple(choices[i].decode() for i in range(count) if choices[i])
+        menus[key] = result
+    return result
+
+
+# The maximum length of a string field and whether it holds a CALC expression
+# are not exported by the static database API, but we can find out by asking
+# dbVerify about an overlong string and an invalid expression.
+_StringTooLong = re.compile(r"max (\d+)")
+
+
+def _StringField(entry):
+    message = mydbstatic.dbVerify(entry, "0" * 0x10000)
+    match = message and _StringTooLong.search(message)
+    size = int(match.group(1)) + 1 if match else None
+    special = "SPC_CALC" if mydbstatic.dbVerify(entry, "(") else None
+    return size, special
+
+
+# Field types which may have menu choices, the choices are looked up for every
+# field if the field types are not known.
+_CHOICE_TYPES = {"DBF_MENU", "DBF_DEVICE", None}
+
+
+# Extracts the FieldInfo index for the record type under the cursor.  The names
+# of the field types and the menu choices already seen are passed in type_names
+# and menus.
+def _ExtractFields(entry, type_names, menus):
+    fields = {}
+    for index, field_name in enumerate(entry.iterate_fields()):
+        dbf = mydbstatic.dbGetFieldDbfType(entry)
+        dbf_type = type_names.get(dbf)
+        if dbf_type is None:
+            dbf_type = type_names[dbf] = mydbstatic.dbGetFieldTypeString(dbf)
+        if dbf_type == "DBF_MENU":
+            choices = _MenuChoices(entry, menus)
+        elif dbf_type in _CHOICE_TYPES:
+            choices = _MenuChoices(entry)
+        else:
+            choices = None
+        if dbf_type == "DBF_STRING":
+            size, special = _StringField(entry)
+        else:
+            size, special = None, None
+        fields[field_name] = FieldInfo(
+            field_name, index, dbf_type, choices, size, special
+        )
+    return fields
+
+
+# Returns the fields of a record type extracted after an earlier load, updated
+# with the device types now defined for the record type under the cursor.  No
+# other field metadata can be changed by loading a DBD.
+def _UpdateDevices(entry, fields):
+    devices = {
+        name: field for name, field in fields.items() if field.dbf_type == "DBF_DEVICE"
+    }
+    if not devices:
+        return fields
+    fields = dict(fields)
+    for field_name in entry.iterate_fields():
+        field = devices.pop(field_name, None)
+        if field is not None:
+            fields[field_name] = field._replace(choices=_MenuChoices(entry))
+            if not devices:
+                break
+    return fields
+
+
+# Extracts the field indexes of every loaded record type in a single pass over
+# the static database.  Record types in known were extracted after an earlier
+# load and only their device types are updated, so over a series of loads each
+# record type is only extracted once.
+def _ExtractRecordTypes(entry, known=None):
+    known = known or {}
+    type_names = {}
+    menus = {}
+    record_types = {}
+    for record_type in entry.iterate_records():
+        fields = known.get(record_type)
+        if fields is None:
+            fields = _ExtractFields(entry, type_names, menus)
+        else:
+            fields = _UpdateDevices(entry, fields)
+        record_types[record_type] = fields
+    return record_types
 
 
 # This class uses a the static database to validate whether the associated
 # record type allows a given value to be written to a given field.
 class ValidateDbField:
-    def __init__(self, db_entry):
-        # Copy the existing entry so it stays on the right record
-        self.dbEntry = DBEntry(db_entry)
+    # Values are checked in Python using the field metadata from the DBD,
+    # only CALC expressions and fields of unknown type are passed to dbVerify.
+    # Setting this flag checks every value with dbVerify as well and asserts
+    # that the two agree, this is intended for testing.
+    cross_check = False
+
+    # Maximum number of validation results remembered by each validator.
+    cache_size = 4096
+
+    def __init__(self, record_type, database=None):
+        self.record_type = record_type
+        self.database = database or current_database.get()
+        self.__dbEntry = None
         self.__FieldInfo = None
-
-    # Computes list of valid names and creates associated arginfo
-    # definitions.  This is postponed quite late to try and ensure the menus
-    # are fully populated, in other words we don't want to fire this until
-    # all the dbd files have been loaded.
+        self.__FieldNames = None
+        self.__FieldRanks = None
+        self.__FieldEntries = {}
+        self.__Cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    # Discards the field index and all cached validation results, called
+    # whenever further DBD files are loaded.
+    def Invalidate(self):
+        self.__FieldInfo = None
+        self.__FieldNames = None
+        self.__FieldRanks = None
+        self.__Cache.clear()
+
+    # Returns the cache statistics in the same form as functools.lru_cache.
+    def CacheInfo(self):
+        return CacheInfo(
+            self.cache_hits, self.cache_misses, self.cache_size, len(self.__Cache)
+        )
+
+    # A database entry positioned on this record type.  This is None if the
+    # DBDs are read by the python backend.  If the DBD metadata was loaded from
+    # the cache the static database is read now.
+    @property
+    def dbEntry(self):
+        if self.__dbEntry is None and self.database._UsesLibrary():  # noqa: SLF001
+            entry = DBEntry(database=self.database)
+            status = mydbstatic.dbFindRecordType(entry, self.record_type)
+            assert status == 0, f"Record type {self.record_type} not in DBD"
+            self.__dbEntry = entry
+        return self.__dbEntry
+
+    # Looks up the index of field metadata for this record type, extracted
+    # from the DBDs when they were loaded.
     def __ProcessDbd(self):
-        # set of field names
-        self.__FieldInfo = set()
-        for field_name in self.dbEntry.iterate_fields():
-            if field_name != "NAME":
-                self.__FieldInfo.add(field_name)
+        self.__FieldInfo = self.database._RecordTypeFields(  # noqa: SLF001
+            self.record_type
+        )
+
+    # Returns a database entry positioned on the given field so that dbVerify
+    # can be called, or None if the static database is not used.  These
+    # are only needed for a few fields, so are created on demand.
+    def __FieldEntry(self, name):
+        entry = self.__FieldEntries.get(name)
+        if entry is None and self.dbEntry is not None:
+            entry = DBEntry(self.dbEntry)
+            for field_name in entry.iterate_fields():
+                if field_name == name:
+                    break
+            self.__FieldEntries[name] = entry
+        return entry
+
+    # Returns the field index for this record type, a dictionary mapping
+    # field names to FieldInfo in DBD order.
+    def Fields(self):
+        if self.__FieldInfo is None:
+            self.__ProcessDbd()
+        return self.__FieldInfo
+
+    # Returns the tuple of field names for this record type in DBD order, so
+    # indexed by the field index.
+    def FieldNames(self):
+        if self.__FieldNames is None:
+            self.__FieldNames = tuple(self.Fields())
+        return self.__FieldNames
+
+    # Returns the tuple of alphabetical ranks of the field names indexed by the
+    # field index, so that fields can be sorted by name comparing integers.
+    def FieldRanks(self):
+        if self.__FieldRanks is None:
+            names = self.FieldNames()
+            order = sorted(range(len(names)), key=names.__getitem__)
+            ranks = [0] * len(names)
+            for rank, index in enumerate(order):
+                ranks[index] = rank
+            self.__FieldRanks = tuple(ranks)
+        return self.__FieldRanks
 
     # This method raises an attribute error if the given field name is
     # invalid.
     def ValidFieldName(self, name):
-        if self.__FieldInfo is None:
-            self.__ProcessDbd()
-        if name not in self.__FieldInfo:
+        if name == "NAME" or name not in self.Fields():
             raise AttributeError(f"Invalid field name {name}")
 
+    # Returns the FieldInfo for the given field, raises an attribute error if
+    # the field name is invalid.
+    def GetFieldInfo(self, name):
+        self.ValidFieldName(name)
+        return self.__FieldInfo[name]
+
     # This method raises an exeption if the given field name does not exist
     # or if the value cannot be validly written.
     def ValidFieldValue(self, name, value):
-        # First check the field name is valid
-        self.ValidFieldName(name)
         value = str(value)
-
-        # Set the database cursor to the field
-        for field_name in self.dbEntry.iterate_fields():
-            if field_name == name:
-                break
-
-        # Now see if we can write the value to it
-        message = mydbstatic.dbVerify(self.dbEntry, value)
+        message = self.FieldValueError(name, value)
         assert message is None, f"Can't write '{value}' to field {name}: {message}"
 
+    # Returns None if the string value can be written to the given field,
+    # otherwise the reason why not, and raises an attribute error if the field
+    # name is invalid.  The same values are written to the same fields over
+    # and over again, so the results are cached.
+    def FieldValueError(self, name, value):
+        key = (name, value)
+        try:
+            message = self.__Cache[key]
+        except KeyError:
+            self.cache_misses += 1
+            message = self.__VerifyField(name, value)
+            self.__Cache[key] = message
+            if len(self.__Cache) > self.cache_size:
+                self.__Cache.popitem(last=False)
+        else:
+            self.cache_hits += 1
+            self.__Cache.move_to_end(key)
+        return message
 
-# The same database pointer is used for all DBD files: this means that all
-# the DBD entries are accumulated into a single large database.
-_db = ctypes.c_void_p()
+    # Returns None if the value can be written to the field, otherwise the
+    # reason why not.
+    def __VerifyField(self, name, value):
+        # First check the field name is valid
+        field = self.GetFieldInfo(name)
+
+        # Now see if we can write the value to it.  CALC expressions and fields
+        # of unknown type can only be checked by dbVerify, which needs the
+        # static database to be read if the DBDs came from the cache.
+        message = dbverify.VerifyField(field, value)
+        library_only = field.special or field.dbf_type is None
+        if (library_only and message is None) or self.cross_check:
+            entry = self.__FieldEntry(name)
+            if entry is not None:
+                checked = mydbstatic.dbVerify(entry, value)
+                if library_only:
+                    message = message or checked
+                else:
+                    assert message == checked, (
+                        f"Verifying '{value}' for field {name}: "
+                        f"got {message!r}, dbVerify gives {checked!r}"
+                    )
+        return message
 
 
 class DBEntry:
@@ -98,14 +352,20 @@ class DBEntry:
     record types and fields within them with the iterate methods.
 
     If entry is specified on init and is a DBEntry instance, it
-    will be copied so that its position is maintained.
+    will be copied so that its position is maintained.  Otherwise the
+    entry is created in the given database, or the current database.
     """
 
-    def __init__(self, entry=None):
-        assert _db, "LoadDdbFile not called yet"
+    def __init__(self, entry=None, database=None):
+        if entry is not None:
+            database = entry.database
+        elif database is None:
+            database = current_database.get()
+        self.database = database
+        db = database._StaticDatabase()  # noqa: SLF001
         if entry is None:
             # No entry, so alloc a new one
-            self._as_parameter_ = mydbstatic.dbAllocEntry(_db)
+            self._as_parameter_ = mydbstatic.dbAllocEntry(db)
         else:
             # Existing entry, copy it so it stays on the same record
             self._as_parameter_ = mydbstatic.dbCopyEntry(entry)
@@ -128,48 +388,344 @@ class DBEntry:
         mydbstatic.dbFreeEntry(self._as_parameter_)
 
 
-def LoadDbdFile(dbdfile, on_use=None):
-    dirname, filename = os.path.split(dbdfile)
-
-    # Read the specified dbd file into the current database.  This allows
-    # us to see any new definitions.
-    curdir = os.getcwd()
-    if dirname:
-        os.chdir(dirname)
-
-    # We add <epics_base>/dbd to the path so that dbd includes can be resolved.
-    separator = ":"
-    if platform.system() == "Windows":
-        separator = ";"
-
-    status = mydbstatic.dbReadDatabase(
-        ctypes.byref(_db),
-        filename,
-        separator.join([".", os.path.join(_epics_base, "dbd")]),
-        None,
+_PATH_SEPARATOR = ";" if platform.system() == "Windows" else ":"
+
+
+# Returns the include path with relative directories made relative to the
+# directory of the DBD file rather than the current directory.
+def _AbsoluteIncludePath(directory, include_path):
+    return _PATH_SEPARATOR.join(
+        os.path.normpath(os.path.join(directory, path))
+        for path in include_path.split(_PATH_SEPARATOR)
     )
-    os.chdir(curdir)
-    assert status == 0, f"Error reading database {dbdfile} (status {status})"
 
-    # Enumerate all the record types and build a record generator class
-    # for each one that we've not seen before.
-    entry = DBEntry()
-    for record_type in entry.iterate_records():
-        if not hasattr(records, record_type):
-            validate = ValidateDbField(entry)
-            records._PublishRecordType(on_use, record_type, validate)  # noqa: SLF001
-
-
-def InitialiseDbd(epics_base=None, host_arch=None):
-    global _epics_base
-    if epics_base:
-        # Import from given location
-        mydbstatic.ImportFunctions(epics_base, host_arch)
-        _epics_base = epics_base
-    else:
-        # Import from epicscorelibs installed libs
-        from epicscorelibs import path
-
-        mydbstatic.ImportFunctionsFrom(path.get_lib("dbCore"))
-        _epics_base = path.base_path
-    LoadDbdFile("base.dbd")
+
+# Locates the DBD file in the same way as dbReadDatabase, returns None if it
+# can't be found.
+def _FindDbdFile(directory, filename, include_path):
+    for path in include_path.split(_PATH_SEPARATOR):
+        dbd_path = os.path.join(directory, path, filename)
+        if os.path.isfile(dbd_path):
+            return dbd_path
+    return None
+
+
+def _Tuple(value):
+    return None if value is None else tuple(value)
+
+
+# Converts the field descriptions of each record type read from the cache, or
+# by the python backend, into the field index of each record type.
+def _RecordFields(record_types):
+    return {
+        record_type: {
+            field[0]: FieldInfo(*field[:3], _Tuple(field[3]), *field[4:])
+            for field in fields
+        }
+        for record_type, fields in record_types.items()
+    }
+
+
+# There is only one static database library per process, loaded by the first
+# database to need it, and its DBD parser is not reentrant, so every read of a
+# DBD file by the library is serialised by this lock.
+_library_lock = threading.Lock()
+
+
+def _ImportLibrary(import_library):
+    with _library_lock:
+        if mydbstatic._libdb is None:  # noqa: SLF001
+            with profiling.Timer("import library"):
+                import_library()
+
+
+class DBDatabase:
+    """A set of loaded DBD files and the record types they define.  Each
+    database has its own static database, record types and validators, so
+    databases for IOCs built from different DBDs can be used side by side.
+    Records are created using the record types in :attr:`records`."""
+
+    def __init__(self):
+        # The same database pointer is used for all DBD files in this database:
+        # all the DBD entries are accumulated into a single large database.
+        # Loading DBDs and reading them into it is serialised by __lock.
+        self.__db = ctypes.c_void_p()
+        self.__lock = threading.RLock()
+        self.records = RecordTypes(self)
+
+        # When a cache directory is configured the record type metadata is
+        # saved after each DBD load and reused by later builds, in which case
+        # the static database is only read when a DBD is not found in the
+        # cache.
+        self.__epics_base = None
+        self.__cache_dir = None
+        self.__cache_key = ""
+        self.__base_version = ""
+
+        # Field indexes of all record types, extracted from the static
+        # database or read from the cache or by the python backend after every
+        # load.
+        self.__record_fields = None
+
+        # Every DBD loaded so far as (directory, filename, include path), the
+        # static database has only read the first __dbds_read of these.
+        self.__loaded_dbds = []
+        self.__dbds_read = 0
+
+        # Loads the static database library, postponed until it is first
+        # needed.
+        self.__import_library = None
+
+        # The definitions read by the python DBD backend, None when the static
+        # database library is used.
+        self.__definitions = None
+
+        # Arguments to the last call to InitialiseDbd and the index in
+        # __loaded_dbds of the base.dbd it loaded, used to recreate the same
+        # DBD state in a new process.
+        self.__initialise_args = None
+        self.__initialise_dbd = 0
+
+    def _IncludePath(self):
+        # We add <epics_base>/dbd to the path so that dbd includes can be
+        # resolved.
+        return _PATH_SEPARATOR.join([".", os.path.join(self.__epics_base, "dbd")])
+
+    # Returns the static database with every loaded DBD read into it.
+    def _StaticDatabase(self):
+        assert self.__definitions is None, "Static database not used by python backend"
+        if self.__dbds_read < len(self.__loaded_dbds):
+            # DBDs loaded from the cache must be read now
+            with self.__lock:
+                self.__ReadLoadedDbds()
+        assert self.__db, "LoadDdbFile not called yet"
+        return self.__db
+
+    # Returns whether DBDs are read by the static database library rather
+    # than the python backend.
+    def _UsesLibrary(self):
+        return self.__definitions is None
+
+    # Returns the field index of the given record type.
+    def _RecordTypeFields(self, record_type):
+        return self.__record_fields[record_type]
+
+    # Reads all loaded DBD files not yet seen by the static database, or by
+    # the python backend.
+    def __ReadLoadedDbds(self):
+        if self.__definitions is not None:
+            for directory, filename, include_path in self.__loaded_dbds[
+                self.__dbds_read :
+            ]:
+                with profiling.Timer("parse DBD"):
+                    self.__definitions.ReadDbd(directory, filename, include_path)
+            self.__dbds_read = len(self.__loaded_dbds)
+            return
+
+        if self.__import_library:
+            _ImportLibrary(self.__import_library)
+            self.__import_library = None
+
+        for directory, filename, include_path in self.__loaded_dbds[self.__dbds_read :]:
+            # Read the specified dbd file into the current database.  This
+            # allows us to see any new definitions.  The include path is made
+            # absolute rather than changing the current directory of the whole
+            # process.
+            with _library_lock:
+                status = mydbstatic.dbReadDatabase(
+                    ctypes.byref(self.__db),
+                    filename,
+                    _AbsoluteIncludePath(directory, include_path),
+                    None,
+                )
+            dbdfile = os.path.join(directory, filename)
+            assert status == 0, f"Error reading database {dbdfile} (status {status})"
+        self.__dbds_read = len(self.__loaded_dbds)
+
+    def LoadDbdFile(self, dbdfile, on_use=None):
+        """Loads a DBD file into this database, see :func:`LoadDbdFile`."""
+        self.LoadDbdFiles([dbdfile], on_use)
+
+    def LoadDbdFiles(self, dbdfiles, on_use=None):
+        """Loads a list of DBD files into this database, see
+        :func:`LoadDbdFiles`."""
+        with profiling.Timer("LoadDbdFile"), self.__lock:
+            self.__LoadDbdFiles(dbdfiles, on_use)
+
+    def __LoadDbdFiles(self, dbdfiles, on_use):
+        include_path = self._IncludePath()
+        for dbdfile in dbdfiles:
+            dirname, filename = os.path.split(dbdfile)
+            self.__loaded_dbds.append(
+                (os.path.abspath(dirname), filename, include_path)
+            )
+
+            # Look for the record types defined after these loads in the cache.
+            # If a DBD can't be found the chain of cache keys is broken and we
+            # stop caching.
+            if self.__cache_dir and self.__cache_key is not None:
+                dbd_path = _FindDbdFile(*self.__loaded_dbds[-1])
+                if dbd_path:
+                    self.__cache_key = dbdcache.CacheKey(
+                        self.__cache_key, dbd_path, include_path, self.__base_version
+                    )
+                else:
+                    self.__cache_key = None
+
+        caching = self.__cache_dir and self.__cache_key is not None
+        cached = None
+        if caching:
+            cached = dbdcache.ReadCache(self.__cache_dir, self.__cache_key)
+
+        if cached is not None:
+            self.__record_fields = _RecordFields(cached)
+        else:
+            self.__ReadLoadedDbds()
+            if self.__definitions is not None:
+                record_fields = self.__definitions.RecordFields()
+                self.__record_fields = _RecordFields(record_fields)
+                if caching:
+                    dbdcache.WriteCache(
+                        self.__cache_dir, self.__cache_key, record_fields
+                    )
+            else:
+                self.__record_fields = _ExtractRecordTypes(
+                    DBEntry(database=self), self.__record_fields
+                )
+                if caching:
+                    dbdcache.WriteCache(
+                        self.__cache_dir,
+                        self.__cache_key,
+                        {
+                            record_type: list(fields.values())
+                            for record_type, fields in self.__record_fields.items()
+                        },
+                    )
+
+        # Publish each record type that we've not seen before, its record
+        # generator class will be built when first used.
+        self.records._InvalidateValidators()  # noqa: SLF001
+        for record_type in self.__record_fields:
+            if record_type not in self.records:
+                self.records._PublishRecordType(on_use, record_type)  # noqa: SLF001
+
+    # Returns a description of the EPICS base version for the cache key.
+    def __ReadBaseVersion(self):
+        try:
+            with open(
+                os.path.join(self.__epics_base, "include", "epicsVersion.h")
+            ) as header:
+                return header.read()
+        except OSError:
+            return ""
+
+    # Returns a picklable description of the DBD files loaded so far.
+    def _Configuration(self):
+        return (
+            self.__initialise_args,
+            [
+                os.path.join(directory, filename)
+                for directory, filename, _ in self.__loaded_dbds[
+                    self.__initialise_dbd + 1 :
+                ]
+            ],
+        )
+
+    # Loads the DBD files described by _Configuration, unless this database
+    # already has record types loaded, as happens when the process was forked.
+    def _Reconfigure(self, configuration):
+        initialise_args, dbd_files = configuration
+        if initialise_args is not None and not self.records.GetRecords():
+            self.InitialiseDbd(*initialise_args)
+            self.LoadDbdFiles(dbd_files)
+
+    def InitialiseDbd(
+        self, epics_base=None, host_arch=None, cache_dir=None, backend="library"
+    ):
+        """Loads base.dbd into this database, see :func:`InitialiseDbd`."""
+        assert backend in ("library", "python"), f"Unknown DBD backend {backend}"
+        self.__definitions = None
+        if backend == "python":
+            # DBD files are read in Python, only the path to base is needed
+            if epics_base:
+                self.__epics_base = epics_base
+            else:
+                from epicscorelibs import path
+
+                self.__epics_base = path.base_path
+            import_library = None
+            self.__definitions = dbdparser.DbdDefinitions(_PATH_SEPARATOR)
+        elif epics_base:
+            # Import from given location
+            def import_library():
+                mydbstatic.ImportFunctions(epics_base, host_arch)
+
+            self.__epics_base = epics_base
+        else:
+            # Import from epicscorelibs installed libs
+            from epicscorelibs import path
+
+            def import_library():
+                mydbstatic.ImportFunctionsFrom(path.get_lib("dbCore"))
+
+            self.__epics_base = path.base_path
+        self.__import_library = import_library
+
+        if cache_dir is None:
+            cache_dir = os.environ.get("EPICSDBBUILDER_CACHE_DIR")
+        self.__cache_dir = cache_dir
+        self.__cache_key = ""
+        self.__base_version = self.__ReadBaseVersion()
+        self.__initialise_args = (epics_base, host_arch, cache_dir, backend)
+        self.__initialise_dbd = len(self.__loaded_dbds)
+        self.LoadDbdFile("base.dbd")
+
+
+# The database used by the module level functions and records, which can be
+# changed for the current context by DatabaseContext.
+_default_database = DBDatabase()
+current_database = contextvars.ContextVar("database", default=_default_database)
+
+
+# Forwards everything to the record types of the current database.  This is
+# published as records: every record type loaded from a DBD is present as an
+# attribute with the name of the record type.
+#
+# For example, to create an ai record, simply write
+#
+#   records.ai('NAME', DESC = 'A test ai record', EGU = 'V')
+#
+class _CurrentRecordTypes:
+    def __getattr__(self, record_type):
+        return getattr(current_database.get().records, record_type)
+
+    def __contains__(self, record_type):
+        return record_type in current_database.get().records
+
+    def __dir__(self):
+        return dir(current_database.get().records)
+
+
+records = _CurrentRecordTypes()
+
+
+def InitialiseDbd(epics_base=None, host_arch=None, cache_dir=None, backend="library"):
+    current_database.get().InitialiseDbd(epics_base, host_arch, cache_dir, backend)
+
+
+def LoadDbdFile(dbdfile, on_use=None):
+    current_database.get().LoadDbdFile(dbdfile, on_use)
+
+
+def LoadDbdFiles(dbdfiles, on_use=None):
+    current_database.get().LoadDbdFiles(dbdfiles, on_use)
+
+
+# Returns a picklable description of the DBD files loaded so far.
+def _Configuration():
+    return current_database.get()._Configuration()  # noqa: SLF001
+
+
+# Loads the DBD files described by _Configuration into the current database.
+def _Reconfigure(configuration):
+    current_database.get()._Reconfigure(configuration)  # noqa: SLF001
@@ -0,0 +1,56 @@
+"""Persistent cache of the record type metadata extracted from DBD files.
+
+Each call to LoadDbdFile adds to the record types already loaded, so a cache
+entry describes the complete set of record types after loading a particular
+sequence of DBD files.  The cache key for each load is computed from the key
+of the previous load together with the contents of the DBD file, the include
+path used to read it and the EPICS base version.  Note that the contents of
+files included by the DBD are not part of the key.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+# Increment this if the format of the cached data changes.
+CACHE_VERSION = 1
+
+
+def CacheKey(previous, dbd_file, include_path, base_version):
+    key = hashlib.sha256()
+    for part in [str(CACHE_VERSION), previous, include_path, base_version]:
+        key.update(part.encode())
+        key.update(b"\0")
+    with open(dbd_file, "rb") as dbd:
+        key.update(dbd.read())
+    return key.hexdigest()
+
+
+def _CacheFile(cache_dir, key):
+    return os.path.join(cache_dir, f"dbd-{key}.json")
+
+
+# Returns the cached record types for the given key, a dictionary mapping each
+# record type to its list of field descriptions, or None if not cached.
+def ReadCache(cache_dir, key):
+    try:
+        with open(_CacheFile(cache_dir, key)) as cache:
+            return json.load(cache)["record_types"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+# Writes the cache file, going through a temporary file so that concurrent
+# builds never see a partially written cache.
+def WriteCache(cache_dir, key, record_types):
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_name = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as cache:
+            json.dump({"record_types": record_types}, cache)
+        os.chmod(temp_name, 0o644)
+        os.replace(temp_name, _CacheFile(cache_dir, key))
+    except BaseException:
+        os.unlink(temp_name)
+        raise
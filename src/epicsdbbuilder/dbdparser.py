@@ -0,0 +1,236 @@
+"""Pure Python reader for DBD files.
+
+This reads the menus, record types and device support definitions from DBD
+files, following includes and path statements in the same way as
+dbReadDatabase, and extracts the field metadata used for validation without
+the EPICS static database library.  All other definitions are skipped.
+"""
+
+import os
+import re
+
+_TOKEN = re.compile(
+    r"""[ \t\r\n]*(?:
+        (?P<comment>\#.*) |
+        (?P<string>"(?:[^"\\]|\\.)*") |
+        (?P<bare>[a-zA-Z0-9_\-+:./\\\[\]<>;]+) |
+        (?P<punct>[(){},]) |
+        (?P<error>.))""",
+    re.VERBOSE,
+)
+
+
+# Lines starting with % are C code copied into generated headers.
+def _Tokenise(filename):
+    with open(filename) as dbd:
+        for line_number, line in enumerate(dbd, 1):
+            if line.lstrip().startswith("%"):
+                continue
+            for match in _TOKEN.finditer(line.rstrip()):
+                kind = match.lastgroup
+                if kind is None or kind == "comment":
+                    continue
+                text = match[kind]
+                assert kind != "error", f"{filename}:{line_number}: unexpected '{text}'"
+                if kind == "string":
+                    text = text[1:-1]
+                yield kind, text, filename, line_number
+
+
+# The definitions read from all the DBD files read so far.  As with the static
+# database, a menu or record type defined a second time is ignored.
+class DbdDefinitions:
+    def __init__(self, path_separator):
+        self.path_separator = path_separator
+        self.menus = {}
+        self.record_types = {}
+        self.devices = {}
+        self.__files = []
+        self.__token = None
+
+    # Reads the DBD file, looking for it and any included files in the
+    # include path relative to the given directory.
+    def ReadDbd(self, directory, filename, include_path):
+        self.__directory = directory
+        self.__include_path = include_path
+        self.__files = []
+        self.__Include(filename)
+        while self.__token is not None:
+            self.__Definition()
+
+    # Returns the field metadata of every record type as a dictionary mapping
+    # each record type to a list of (name, index, dbf_type, choices, size,
+    # special) for each field in DBD order.  The choices of a DBF_DEVICE field
+    # are the device types defined so far.
+    def RecordFields(self):
+        return {
+            record_type: [
+                self.__FieldInfo(record_type, index, field)
+                for index, field in enumerate(fields)
+            ]
+            for record_type, fields in self.record_types.items()
+        }
+
+    def __FieldInfo(self, record_type, index, field):
+        name, dbf_type, attributes = field
+        if dbf_type == "DBF_MENU":
+            choices = self.menus[attributes["menu"]]
+        elif dbf_type == "DBF_DEVICE":
+            choices = tuple(self.devices.get(record_type, ()))
+        else:
+            choices = None
+        if dbf_type == "DBF_STRING":
+            size = int(attributes["size"]) if "size" in attributes else None
+            special = "SPC_CALC" if attributes.get("special") == "SPC_CALC" else None
+        else:
+            size, special = None, None
+        return (name, index, dbf_type, choices, size, special)
+
+    def __Error(self, message):
+        if self.__token is None:
+            return AssertionError(f"Unexpected end of DBD file: {message}")
+        _, _, filename, line = self.__token
+        return AssertionError(f"{filename}:{line}: {message}")
+
+    # Included files are read by stacking their tokens on top of the tokens
+    # of the including file.
+    def __Include(self, filename):
+        path = filename
+        if not os.path.isabs(filename):
+            for directory in self.__include_path.split(self.path_separator):
+                path = os.path.join(self.__directory, directory, filename)
+                if os.path.isfile(path):
+                    break
+            else:
+                raise self.__Error(f"Can't find DBD file {filename}")
+        self.__files.append(_Tokenise(path))
+        self.__Next()
+
+    def __Next(self):
+        while self.__files:
+            token = next(self.__files[-1], None)
+            if token is not None:
+                self.__token = token
+                return
+            self.__files.pop()
+        self.__token = None
+
+    def __Peek(self):
+        return None if self.__token is None else self.__token[1]
+
+    def __Expect(self, text):
+        if self.__Peek() != text:
+            raise self.__Error(f"Expected '{text}', found '{self.__Peek()}'")
+        self.__Next()
+
+    # Returns the current name or string token without moving on.
+    def __Argument(self):
+        if self.__token is None or self.__token[0] not in ("bare", "string"):
+            raise self.__Error("Expected name or string")
+        return self.__token[1]
+
+    def __Word(self):
+        text = self.__Argument()
+        self.__Next()
+        return text
+
+    # Parses a statement: a keyword and its string argument for include and
+    # path statements, otherwise an optional list of arguments in parentheses
+    # and an optional body in braces.  Returns the keyword and the arguments,
+    # leaving the token at the start of any body.
+    def __Statement(self):
+        keyword = self.__Word()
+        if keyword in ("include", "path", "addpath"):
+            # The argument is consumed by reading the next token, which for
+            # an include must come from the included file.
+            argument = self.__Word() if keyword != "include" else self.__Argument()
+            if keyword == "include":
+                self.__Include(argument)
+            elif keyword == "path":
+                self.__include_path = argument
+            else:
+                self.__include_path += self.path_separator + argument
+            return None, None
+
+        arguments = []
+        if self.__Peek() == "(":
+            self.__Next()
+            while self.__Peek() != ")":
+                arguments.append(self.__Word())
+                if self.__Peek() == ",":
+                    self.__Next()
+            self.__Next()
+        return keyword, arguments
+
+    # Calls parse for each statement in the body in braces following a
+    # statement, if any.
+    def __Body(self, parse):
+        if self.__Peek() == "{":
+            self.__Next()
+            while self.__Peek() != "}":
+                if self.__token is None:
+                    raise self.__Error("Expected '}'")
+                parse()
+            self.__Next()
+
+    # Skips the body in braces following a statement, if any.
+    def __SkipBody(self):
+        if self.__Peek() == "{":
+            depth = 0
+            while True:
+                text = self.__Peek()
+                if text is None:
+                    raise self.__Error("Expected '}'")
+                self.__Next()
+                if text == "{":
+                    depth += 1
+                elif text == "}":
+                    depth -= 1
+                    if depth == 0:
+                        break
+
+    def __Definition(self):
+        keyword, arguments = self.__Statement()
+        if keyword == "menu":
+            self.__Menu(arguments[0])
+        elif keyword == "recordtype":
+            self.__RecordType(arguments[0])
+        elif keyword == "device":
+            record_type, _, _, choice = arguments
+            choices = self.devices.setdefault(record_type, [])
+            if choice not in choices:
+                choices.append(choice)
+        elif keyword is not None:
+            self.__SkipBody()
+
+    def __Menu(self, name):
+        choices = []
+
+        def parse():
+            keyword, arguments = self.__Statement()
+            if keyword == "choice":
+                choices.append(arguments[1])
+
+        self.__Body(parse)
+        self.menus.setdefault(name, tuple(choices))
+
+    def __RecordType(self, name):
+        fields = []
+
+        def parse():
+            keyword, arguments = self.__Statement()
+            if keyword == "field":
+                attributes = {}
+
+                def parse_attribute():
+                    attribute, values = self.__Statement()
+                    if attribute is not None:
+                        attributes[attribute] = values[0] if values else None
+
+                self.__Body(parse_attribute)
+                fields.append((arguments[0], arguments[1], attributes))
+            elif keyword is not None:
+                self.__SkipBody()
+
+        self.__Body(parse)
+        self.record_types.setdefault(name, fields)
@@ -0,0 +1,347 @@
+"""Reading existing .db files into records.
+
+The file is read a line at a time and each record is created as soon as it has
+been parsed, so only the records themselves are held in memory.  Field values
+are validated as they are assigned in the same way as for records created in
+Python, and records are published with exactly the names given in the file.
+
+Comments immediately preceding a record, or inside it, are attached to the
+record, other comments become header lines of the record set.  Aliases for
+records not defined in the file are kept as body lines.
+"""
+
+import json
+import os
+import re
+
+from .const_array import ConstArray
+from .dbd import records
+from .recordset import recordset
+
+__all__ = ["ReadRecords"]
+
+
+# Bare words may include macro references such as $(P) or ${P=default}, which
+# may themselves contain one level of nested references.
+_NESTED_MACRO = r"\$(?:\([^()]*\)|\{[^{}]*\})"
+_MACRO = rf"\$(?:\((?:[^()$]|{_NESTED_MACRO})*\)|\{{(?:[^{{}}$]|{_NESTED_MACRO})*\}})"
+_TOKEN = re.compile(
+    r"""[ \t\r\n]*(?:
+        (?P<comment>\#.*) |
+        (?P<string>"(?:[^"\\]|\\.)*") |
+        (?P<bare>(?:[a-zA-Z0-9_\-+:./\\<>;]|"""
+    + _MACRO
+    + r""")+) |
+        (?P<punct>[(){},\[\]]) |
+        (?P<error>.))""",
+    re.VERBOSE,
+)
+
+# The commonest statement, a field with a quoted value on a line of its own, is
+# returned as a single token of kind "field" with text (name, value).
+_FIELD_LINE = re.compile(
+    r'[ \t]*field\([ \t]*(\w+)[ \t]*,[ \t]*("(?:[^"\\]|\\.)*")[ \t]*\)\s*$'
+)
+
+_ESCAPE = re.compile(r"\\(?:x([0-9a-fA-F]{1,2})|([0-7]{1,3})|(.))")
+_ESCAPES = {
+    "a": "\a",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+    "v": "\v",
+}
+
+
+def _Unescape(match):
+    hex_digits, octal_digits, ch = match.groups()
+    if hex_digits:
+        return chr(int(hex_digits, 16))
+    elif octal_digits:
+        return chr(int(octal_digits, 8))
+    else:
+        return _ESCAPES.get(ch, ch)
+
+
+# Converts a quoted string into its value, translating escapes in the same way
+# as dbTranslateEscape.
+def _StringValue(text):
+    text = text[1:-1]
+    if "\\" in text:
+        text = _ESCAPE.sub(_Unescape, text)
+    return text
+
+
+# Bare words in JSON values which are not quoted when converted to JSON.
+_JSON_LITERAL = re.compile(r"-?\d+(\.\d*)?([eE][+-]?\d+)?$|true$|false$|null$")
+
+
+# An arbitrary value in braces or brackets which could not be converted.  This
+# is written back to the database unchanged.
+class _RawValue:
+    def __init__(self, text):
+        self.text = text
+
+    def Validate(self, record, fieldname):
+        pass
+
+    def FormatDb(self, record, fieldname):
+        return self.text
+
+    def __str__(self):
+        return self.text
+
+
+class _Token:
+    __slots__ = ("kind", "text", "line")
+
+    def __init__(self, kind, text, line):
+        self.kind = kind
+        self.text = text
+        self.line = line
+
+
+def _Tokenise(lines, filename):
+    for line_number, line in enumerate(lines, 1):
+        match = _FIELD_LINE.match(line)
+        if match:
+            name, value = match.groups()
+            yield _Token("field", (name, _StringValue(value)), line_number)
+            continue
+        for match in _TOKEN.finditer(line.rstrip()):
+            kind = match.lastgroup
+            if kind is None:
+                continue
+            text = match[kind]
+            assert kind != "error", f"{filename}:{line_number}: unexpected '{text}'"
+            yield _Token(kind, text, line_number)
+
+
+class _Parser:
+    def __init__(self, lines, filename, record_set):
+        self.tokens = _Tokenise(lines, filename)
+        self.filename = filename
+        self.record_set = record_set
+        self.token = None
+        self.comments = []
+        self.Next()
+
+    def Error(self, message, line=None):
+        if line is None:
+            line = self.token.line if self.token else "EOF"
+        return AssertionError(f"{self.filename}:{line}: {message}")
+
+    # Advances to the next token, collecting any comments on the way.
+    def Next(self):
+        for token in self.tokens:
+            if token.kind == "comment":
+                self.comments.append(token)
+            else:
+                self.token = token
+                return
+        self.token = None
+
+    def Expect(self, text):
+        if self.token is None or self.token.text != text:
+            if self.token is None:
+                found = "end of file"
+            elif self.token.kind == "field":
+                found = "'field'"
+            else:
+                found = f"'{self.token.text}'"
+            raise self.Error(f"expected '{text}', found {found}")
+        self.Next()
+
+    def Word(self):
+        token = self.token
+        if token is None or token.kind not in ("bare", "string"):
+            raise self.Error("expected name or string")
+        self.Next()
+        if token.kind == "string":
+            return _StringValue(token.text)
+        else:
+            return token.text
+
+    def Value(self):
+        if self.token is not None and self.token.text in "{[":
+            return self.JsonValue()
+        else:
+            return self.Word()
+
+    # Collects the tokens of a value in braces or brackets.  Bare words are
+    # quoted where necessary to convert the relaxed JSON allowed in a database
+    # into standard JSON.
+    def JsonValue(self):
+        depth = 0
+        parts = []
+        text = []
+        while True:
+            token = self.token
+            if token is None:
+                raise self.Error("unterminated JSON value")
+            text.append(token.text)
+            if token.kind == "bare":
+                for word in re.split("(:)", token.text):
+                    if word == ":" or _JSON_LITERAL.match(word) or not word:
+                        parts.append(word)
+                    else:
+                        parts.append(json.dumps(word))
+            else:
+                parts.append(token.text)
+            if token.text in "{[":
+                depth += 1
+            elif token.text in "}]":
+                depth -= 1
+            self.Next()
+            if depth == 0:
+                break
+
+        try:
+            value = json.loads(" ".join(parts))
+        except ValueError:
+            return _RawValue(" ".join(text))
+        if isinstance(value, list):
+            try:
+                return ConstArray(value)
+            except AssertionError:
+                return _RawValue(" ".join(text))
+        return value
+
+    # Returns the text of the comments read before the given line which are
+    # part of the same block of lines, any earlier comments are added to the
+    # header.
+    def TakeComments(self, line):
+        block = []
+        for comment in reversed(self.comments):
+            if line is None or comment.line != line - 1:
+                break
+            block.append(comment.text)
+            line = comment.line
+        for comment in self.comments[: len(self.comments) - len(block)]:
+            self.record_set.AddHeaderLine(comment.text)
+        self.comments.clear()
+        return block[::-1]
+
+    def Parse(self):
+        while self.token is not None:
+            keyword = self.token.text
+            line = self.token.line
+            if keyword in ("record", "grecord"):
+                self.Next()
+                self.Record(self.TakeComments(line))
+            elif keyword == "alias":
+                self.Next()
+                self.TopLevelAlias()
+            elif keyword == "include":
+                self.Next()
+                self.Include()
+            elif self.token.kind == "field" or keyword == "field":
+                raise self.Error("field outside record")
+            else:
+                raise self.Error(f"unexpected '{keyword}'")
+        self.TakeComments(None)
+
+    def Record(self, comments):
+        line = self.token.line if self.token else None
+        self.Expect("(")
+        record_type = self.Word()
+        self.Expect(",")
+        name = self.Word()
+        end_line = self.token.line if self.token else None
+        self.Expect(")")
+
+        try:
+            record = self.record_set.LookupRecord(name)
+        except KeyError:
+            record = None
+        if record is None:
+            if record_type == "*":
+                raise self.Error(f"record {name} not defined", line)
+            try:
+                record_class = getattr(records, record_type)
+            except AttributeError:
+                raise self.Error(f"unknown record type {record_type}", line) from None
+            record = record_class._CreateEmpty(name)  # noqa: SLF001
+            if record._on_use:  # noqa: SLF001
+                record._on_use(record)  # noqa: SLF001
+            self.record_set.PublishRecord(name, record)
+        elif record_type not in ("*", record._type):  # noqa: SLF001
+            raise self.Error(f"record {name} already defined", line)
+
+        aliases = []
+        infos = []
+        if self.token is not None and self.token.text == "{":
+            self.Next()
+            while self.token is not None and self.token.text != "}":
+                self.RecordItem(record, aliases, infos)
+            end_line = self.token.line if self.token else None
+            self.Expect("}")
+
+        # Comments inside the record belong to it, any read after the end of
+        # the record are left for the next one.
+        inside = [c for c in self.comments if c.line <= end_line]
+        comments.extend(comment.text for comment in inside)
+        del self.comments[: len(inside)]
+        record._SetState(({}, aliases, comments, infos))  # noqa: SLF001
+
+    def SetField(self, record, name, value, line):
+        try:
+            setattr(record, name, value)
+        except (AssertionError, AttributeError) as error:
+            raise self.Error(f"{record.name}: {error}", line) from None
+
+    def RecordItem(self, record, aliases, infos):
+        keyword = self.token.text
+        line = self.token.line
+        if self.token.kind == "field":
+            self.SetField(record, *keyword, line)
+            self.Next()
+            return
+
+        self.Next()
+        self.Expect("(")
+        if keyword == "field":
+            name = self.Word()
+            self.Expect(",")
+            self.SetField(record, name, self.Value(), line)
+        elif keyword == "info":
+            name = self.Word()
+            self.Expect(",")
+            infos.append((name, self.Value()))
+        elif keyword == "alias":
+            aliases.append(self.Word())
+        else:
+            raise self.Error(f"unexpected '{keyword}'", line)
+        self.Expect(")")
+
+    def TopLevelAlias(self):
+        self.Expect("(")
+        name = self.Word()
+        self.Expect(",")
+        alias = self.Word()
+        self.Expect(")")
+        try:
+            record = self.record_set.LookupRecord(name)
+        except KeyError:
+            self.record_set.AddBodyLine(f'alias("{name}", "{alias}")')
+        else:
+            record.add_alias(alias)
+
+    def Include(self):
+        filename = self.Word()
+        filename = os.path.join(os.path.dirname(self.filename), filename)
+        ReadRecords(filename, self.record_set)
+
+
+def ReadRecords(file, record_set=None):
+    """Reads the records in a .db file, given as a file name or an open text
+    file, into the current record set or the given record set."""
+    if record_set is None:
+        record_set = recordset
+    if isinstance(file, (str, os.PathLike)):
+        with open(file) as lines:
+            _Parser(lines, os.fspath(file), record_set).Parse()
+    else:
+        _Parser(file, getattr(file, "name", "<file>"), record_set).Parse()
@@ -0,0 +1,251 @@
+"""Pure Python implementation of dbVerify.
+
+The checks here follow those made by dbVerify in the EPICS static database
+library, working from the field metadata extracted from the DBD, so that the
+validity of a field value can be checked without a call into the library.
+"""
+
+import functools
+import math
+import re
+from fractions import Fraction
+
+__all__ = ["VerifyField"]
+
+
+# C isspace() characters, skipped before and after numbers.
+_SPACE = " \t\n\v\f\r"
+
+# Prefixes of the numbers accepted by strtol and strtod, in both cases we
+# match the longest prefix parsed by the C library so that any remaining
+# characters can be reported.
+_INTEGER = re.compile(
+    r"[ \t\n\v\f\r]*([+-]?)(?:0[xX]([0-9a-fA-F]+)|(0[0-7]*)|([1-9][0-9]*))"
+)
+_FLOAT = re.compile(
+    r"""[ \t\n\v\f\r]*([+-]?)(?:
+        (?P<inf>inf(?:inity)?) |
+        (?P<nan>nan(?:\([0-9A-Za-z_]*\))?) |
+        (?P<hex>0x(?:[0-9a-f]+(?:\.[0-9a-f]*)?|\.[0-9a-f]+)(?:p[+-]?\d+)?) |
+        (?P<dec>(?:\d+(?:\.\d*)?|\.\d+)(?:e[+-]?\d+)?))""",
+    re.ASCII | re.IGNORECASE | re.VERBOSE,
+)
+
+_NO_CONVERSION = "Not a valid integer"
+_EXTRANEOUS = "Extraneous characters after number"
+_OVERFLOW = "Number too large for field type"
+_UNDERFLOW = "Number too small for field type"
+
+_ULONG_MAX = (1 << 64) - 1
+_LONG_MIN = -(1 << 63)
+_LONG_MAX = (1 << 63) - 1
+_FLT_MAX = 3.4028234663852886e38
+_FLT_MIN = 1.1754943508222875e-38
+_DBL_MIN = 2.2250738585072014e-308
+
+# Ranges for the signed integer types, the value parsed by strtol must fall
+# within these.
+_SIGNED_RANGES = {
+    "DBF_CHAR": (-0x80, 0x7F),
+    "DBF_SHORT": (-0x8000, 0x7FFF),
+    "DBF_LONG": (-0x80000000, 0x7FFFFFFF),
+    "DBF_INT64": (_LONG_MIN, _LONG_MAX),
+}
+
+# Masks for the unsigned integer types.  Note that strtoul accepts negative
+# numbers and returns them modulo 2^64, and the EPICS parsers only reject
+# values which don't sign extend from the field width.
+_UNSIGNED_MASKS = {
+    "DBF_UCHAR": 0xFF,
+    "DBF_USHORT": 0xFFFF,
+    "DBF_ENUM": 0xFFFF,
+    "DBF_ULONG": 0xFFFFFFFF,
+    "DBF_UINT64": _ULONG_MAX,
+}
+
+
+# Checks that nothing but white space follows the parsed number.
+def _CheckEnd(value, match):
+    if value[match.end() :].strip(_SPACE):
+        return _EXTRANEOUS
+    else:
+        return None
+
+
+# Emulates strtol/strtoul with base 0, returns the signed magnitude parsed
+# together with any error in the characters following it, or None and an error
+# message if there is no number.
+def _ParseInteger(value):
+    # Fast path for plain decimal numbers
+    digits = value[1:] if value[:1] == "-" else value
+    if digits.isdigit() and digits.isascii() and digits[0] != "0":
+        return int(value), None
+
+    match = _INTEGER.match(value)
+    if not match:
+        return None, _NO_CONVERSION
+    sign, hex_digits, octal_digits, decimal_digits = match.groups()
+    if hex_digits:
+        number = int(hex_digits, 16)
+    elif octal_digits:
+        number = int(octal_digits, 8)
+    else:
+        number = int(decimal_digits)
+    if sign == "-":
+        number = -number
+    return number, _CheckEnd(value, match)
+
+
+# The EPICS parsers report overflow by strtol or strtoul before checking for
+# extraneous characters, but check the range of the field type afterwards.
+def _VerifySigned(field, value, low, high):
+    number, message = _ParseInteger(value)
+    if number is None:
+        return message
+    elif not _LONG_MIN <= number <= _LONG_MAX:
+        return _OVERFLOW
+    elif message:
+        return message
+    elif not low <= number <= high:
+        return _OVERFLOW
+    else:
+        return None
+
+
+def _VerifyUnsigned(field, value, mask):
+    number, message = _ParseInteger(value)
+    if number is None:
+        return message
+    elif abs(number) > _ULONG_MAX:
+        return _OVERFLOW
+    elif message:
+        return message
+    number &= _ULONG_MAX
+    if mask < number <= _ULONG_MAX ^ mask:
+        return _OVERFLOW
+    else:
+        return None
+
+
+# Emulates strtod, returns the number parsed together with the text it was
+# parsed from and any error in the characters following it, or None and an
+# error message.  Infinities and NaNs are returned as None.
+def _ParseFloat(value):
+    # Fast path for plain decimal numbers, which Python parses the same way
+    if not value.strip("0123456789.+-eE"):
+        try:
+            return float(value), value, None
+        except ValueError:
+            pass
+
+    match = _FLOAT.match(value)
+    if not match:
+        return None, None, _NO_CONVERSION
+    message = _CheckEnd(value, match)
+    if match["inf"] or match["nan"]:
+        return None, None, message
+    elif match["hex"]:
+        try:
+            return float.fromhex(match[1] + match["hex"]), match["hex"], message
+        except OverflowError:
+            return None, None, _OVERFLOW
+    else:
+        return float(match[1] + match["dec"]), match["dec"], message
+
+
+# Returns the magnitude of the number written as text, without rounding.
+def _ExactValue(text):
+    if text[:2].lower() == "0x":
+        mantissa, _, exponent = text[2:].lower().partition("p")
+        whole, _, fraction = mantissa.partition(".")
+        value = Fraction(int(whole + fraction, 16), 16 ** len(fraction))
+        return value * Fraction(2) ** int(exponent or 0)
+    else:
+        return abs(Fraction(text))
+
+
+# Checks a double or float value as done by epicsParseDouble/Float.
+def _VerifyFloat(field, value, single):
+    number, text, message = _ParseFloat(value)
+    if number is None:
+        return message
+
+    # strtod reports ERANGE for overflow, for underflow to zero, and for
+    # denormal results which had to be rounded.  This is reported before any
+    # extraneous characters.
+    if math.isinf(number):
+        return _OVERFLOW
+    elif number == 0:
+        if re.split("[eEpP]", text)[0].strip("+-0.xX"):
+            return _UNDERFLOW
+    elif abs(number) < _DBL_MIN and _ExactValue(text) != abs(number):
+        return _OVERFLOW
+    if message:
+        return message
+
+    if single:
+        # Note that negative numbers are not checked for underflow.
+        if number > 0 and number <= _FLT_MIN:
+            return _UNDERFLOW
+        elif abs(number) >= _FLT_MAX:
+            return _OVERFLOW
+    return None
+
+
+def _VerifyString(field, value):
+    if field.size is not None and len(value.encode()) >= field.size:
+        return f"String too long, max {field.size - 1} characters"
+    else:
+        return None
+
+
+def _VerifyChoice(field, value):
+    if field.choices is None or value in field.choices:
+        return None
+    elif field.dbf_type == "DBF_DEVICE" and not field.choices:
+        # A record type with no device support accepts any DTYP
+        return None
+    elif field.dbf_type == "DBF_MENU":
+        return "Not a valid menu choice"
+    else:
+        return "Not a valid device type"
+
+
+def _VerifySkip(field, value):
+    return None
+
+
+def _VerifyNoAccess(field, value):
+    return "Not a valid field type"
+
+
+# Verification function for each field type.
+_VERIFIERS = {
+    "DBF_STRING": _VerifyString,
+    "DBF_FLOAT": functools.partial(_VerifyFloat, single=True),
+    "DBF_DOUBLE": functools.partial(_VerifyFloat, single=False),
+    "DBF_MENU": _VerifyChoice,
+    "DBF_DEVICE": _VerifyChoice,
+    "DBF_INLINK": _VerifySkip,
+    "DBF_OUTLINK": _VerifySkip,
+    "DBF_FWDLINK": _VerifySkip,
+    None: _VerifySkip,
+}
+for _dbf_type, (_low, _high) in _SIGNED_RANGES.items():
+    _VERIFIERS[_dbf_type] = functools.partial(_VerifySigned, low=_low, high=_high)
+for _dbf_type, _mask in _UNSIGNED_MASKS.items():
+    _VERIFIERS[_dbf_type] = functools.partial(_VerifyUnsigned, mask=_mask)
+
+
+def VerifyField(field, value):
+    """Checks whether the string value can be written to the field described by
+    the FieldInfo field, returning None if so or an error message as returned
+    by dbVerify.  Expressions written to SPC_CALC fields are not checked and
+    fields of an unknown type are accepted."""
+    if "\0" in value:
+        # The value is passed to the library as a C string
+        value = value.split("\0", 1)[0]
+    if "$" in value and ("$(" in value or "${" in value):
+        # Values containing macros can't be checked until they're expanded
+        return None
+    return _VERIFIERS.get(field.dbf_type, _VerifyNoAccess)(field, value)
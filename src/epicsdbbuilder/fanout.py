@@ -99,7 +99,7 @@ def create_dfanout(name, *record_list, **args):
         del nextargs["PINI"]
 
     def fieldname(i):
-        return f"OUT{(ord('A') + i)}"
+        return f"OUT{chr(ord('A') + i)}"
 
     record_list = _fanout_helper(
         name, record_list, 8, records.dfanout, fieldname, PP, firstargs, nextargs
@@ -0,0 +1,225 @@
+"""Analysis of the links between records.
+
+The links between the records of a record set are extracted into a graph with
+an edge for every link field, from the record containing the field to the
+record linked to.  A link is either a link object created from a record, which
+keeps any specifiers such as PP or CP, or a string naming a record in the set
+followed by any specifiers.  Other strings in link fields, such as constants and
+hardware addresses, are not links.
+
+Processing edges describe which records are processed as a result of processing
+another: a forward link processes its target, an output or input link with PP
+processes its target, and an input link with CP or CPP causes the record
+containing it to be processed whenever its target is.  All the analysis takes
+time linear in the number of records and links.
+"""
+
+from collections import namedtuple
+
+from .recordbase import _Link
+from .recordset import recordset
+
+__all__ = ["LinkGraph", "LinkEdge"]
+
+
+# A link from field of the source record to target_field (or None) of the
+# target record, where source and target are record names.
+LinkEdge = namedtuple(
+    "LinkEdge", ["source", "field", "target", "target_field", "specifiers"]
+)
+
+
+_LINK_TYPES = {"DBF_INLINK", "DBF_OUTLINK", "DBF_FWDLINK"}
+
+
+# Returns a dictionary mapping the DBD index of each link field of the record
+# type validated by validate to its name and DBF type.
+def _LinkFields(validate):
+    return {
+        info.index: (info.name, info.dbf_type)
+        for info in validate.Fields().values()
+        if info.dbf_type in _LINK_TYPES
+    }
+
+
+# Returns whether a link of the given type and specifiers processes its target,
+# and whether it causes its source to be processed when the target is.
+def _Processing(dbf_type, specifiers):
+    if dbf_type == "DBF_FWDLINK":
+        return "CA" not in specifiers, False
+    elif dbf_type == "DBF_INLINK":
+        reverse = "CP" in specifiers or "CPP" in specifiers
+        return "PP" in specifiers, reverse
+    else:
+        return "PP" in specifiers, False
+
+
+class LinkGraph:
+    """The links between the records in the current record set, or in the
+    given record set, extracted when the graph is created."""
+
+    def __init__(self, record_set=None):
+        if record_set is None:
+            record_set = recordset
+        self.__Names = {record.name for record in record_set.Records()}
+        self.edges = []
+        self.__Outgoing = {}
+        self.__Incoming = {}
+        self.__Processing = {}
+        self.__ComponentList = None
+
+        link_fields = {}
+        for record in record_set.Records():
+            validate = record._validate  # noqa: SLF001
+            fields = link_fields.get(validate)
+            if fields is None:
+                fields = link_fields[validate] = _LinkFields(validate)
+            for index, value in record._FieldItems():  # noqa: SLF001
+                field = fields.get(index)
+                if field is not None:
+                    self.__AddLink(record.name, *field, value)
+
+    def __AddLink(self, source, field, dbf_type, value):
+        if isinstance(value, _Link):
+            target = value.record.name
+            target_field = value.field
+            specifiers = tuple(value.specifiers)
+        elif isinstance(value, str):
+            words = value.split()
+            if not words:
+                return
+            target, _, target_field = words[0].partition(".")
+            if target not in self.__Names:
+                return
+            target_field = target_field or None
+            specifiers = tuple(words[1:])
+        else:
+            return
+
+        edge = LinkEdge(source, field, target, target_field, specifiers)
+        self.edges.append(edge)
+        self.__Outgoing.setdefault(source, []).append(edge)
+        self.__Incoming.setdefault(target, []).append(edge)
+
+        forward, reverse = _Processing(dbf_type, specifiers)
+        if forward:
+            self.__Processing.setdefault(source, []).append(target)
+        if reverse:
+            self.__Processing.setdefault(target, []).append(source)
+
+    def Links(self, name):
+        """Returns the links from the named record."""
+        return list(self.__Outgoing.get(name, ()))
+
+    def LinksTo(self, name):
+        """Returns the links to the named record."""
+        return list(self.__Incoming.get(name, ()))
+
+    def Unresolved(self):
+        """Returns the links to records which are not in the record set, such
+        as those created by ImportRecord."""
+        return [edge for edge in self.edges if edge.target not in self.__Names]
+
+    def Processes(self, name):
+        """Returns the names of the records processed as a direct result of
+        processing the named record."""
+        return list(self.__Processing.get(name, ()))
+
+    # Returns the strongly connected components of the processing graph in
+    # reverse topological order, so every component is returned after all the
+    # components it processes.  These are computed when first needed.
+    def __Components(self):
+        if self.__ComponentList is None:
+            self.__ComponentList = self.__FindComponents()
+        return self.__ComponentList
+
+    # This is Tarjan's algorithm made iterative so that long chains of records
+    # do not exhaust the Python stack.
+    def __FindComponents(self):
+        processing = self.__Processing
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        components = []
+        for root in processing:
+            if root in index:
+                continue
+            work = [(root, iter(processing.get(root, ())))]
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            while work:
+                node, successors = work[-1]
+                for successor in successors:
+                    if successor not in index:
+                        index[successor] = lowlink[successor] = len(index)
+                        stack.append(successor)
+                        on_stack.add(successor)
+                        work.append((successor, iter(processing.get(successor, ()))))
+                        break
+                    elif successor in on_stack:
+                        lowlink[node] = min(lowlink[node], index[successor])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent], lowlink[node])
+                    if lowlink[node] == index[node]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == node:
+                                break
+                        components.append(component)
+        return components
+
+    def ProcessingCycles(self):
+        """Returns a list of processing cycles, each a list of the names of
+        records which directly or indirectly process each other."""
+        processing = self.__Processing
+        return [
+            component
+            for component in self.__Components()
+            if len(component) > 1 or component[0] in processing.get(component[0], ())
+        ]
+
+    def ChainDepths(self):
+        """Returns a dictionary giving for each record taking part in any
+        processing the number of records in the longest processing chain
+        starting from that record.  Records in a cycle are counted once."""
+        processing = self.__Processing
+        depths = {}
+        for component in self.__Components():
+            if len(component) == 1:
+                (member,) = component
+                depth = 1 + max(
+                    (
+                        depths[successor]
+                        for successor in processing.get(member, ())
+                        if successor != member
+                    ),
+                    default=0,
+                )
+                depths[member] = depth
+                continue
+
+            members = set(component)
+            depth = len(component) + max(
+                (
+                    depths[successor]
+                    for member in component
+                    for successor in processing.get(member, ())
+                    if successor not in members
+                ),
+                default=0,
+            )
+            for member in component:
+                depths[member] = depth
+        return depths
+
+    def ChainDepth(self):
+        """Returns the number of records in the longest processing chain."""
+        return max(self.ChainDepths().values(), default=0)
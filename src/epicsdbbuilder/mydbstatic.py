@@ -1,6 +1,6 @@
 import os
 import platform
-from ctypes import PyDLL, c_char_p, c_int, c_void_p
+from ctypes import POINTER, PyDLL, c_char_p, c_int, c_void_p
 
 
 class auto_encode(c_char_p):
@@ -24,6 +24,7 @@ _FunctionList = (
     ("dbAllocEntry", c_void_p, None, (c_void_p,)),
     ("dbFirstRecordType", c_int, None, (c_void_p,)),
     ("dbGetRecordTypeName", c_char_p, auto_decode, (c_void_p,)),
+    ("dbFindRecordType", c_int, None, (c_void_p, auto_encode)),
     ("dbNextRecordType", c_int, None, (c_void_p,)),
     ("dbFreeEntry", None, None, (c_void_p,)),
     ("dbCopyEntry", c_void_p, None, (c_void_p,)),
@@ -31,6 +32,10 @@ _FunctionList = (
     ("dbGetFieldName", c_char_p, auto_decode, (c_void_p,)),
     ("dbNextField", c_int, None, (c_void_p,)),
     ("dbVerify", c_char_p, auto_decode, (c_void_p, auto_encode)),
+    ("dbGetFieldDbfType", c_int, None, (c_void_p,)),
+    ("dbGetFieldTypeString", c_char_p, auto_decode, (c_int,)),
+    ("dbGetNMenuChoices", c_int, None, (c_void_p,)),
+    ("dbGetMenuChoices", POINTER(c_char_p), None, (c_void_p,)),
 )
 
 
@@ -41,6 +46,16 @@ def dbVerify(entry, value):
     return None
 
 
+# Fallback implementations for the field type functions, which are not present
+# before EPICS 3.16.  Without these we simply don't know the field types.
+def dbGetFieldDbfType(entry):
+    return -1
+
+
+def dbGetFieldTypeString(dbf_type):
+    return None
+
+
 # This function is called late to complete the process of importing all the
 # exports from this module.  This is done late so that paths.EPICS_BASE can be
 # configured late.
@@ -91,6 +106,10 @@ def ImportFunctions(epics_base, host_arch):
 
 _libdb = None
 
+# If set this is called with the name and function of each library function as
+# it is imported and returns the function to use, this is used for profiling.
+_import_hook = None
+
 
 def GetDbFunction(name, restype=None, argtypes=None, errcheck=None):
     assert _libdb, "ImportFunctionsFrom(path) not called yet"
@@ -128,4 +147,6 @@ def ImportFunctionsFrom(path):
             if name not in globals():
                 raise
         else:
+            if _import_hook:
+                function = _import_hook(name, function)
             globals()[name] = function
@@ -0,0 +1,67 @@
+"""Building records in parallel processes."""
+
+import copy
+from concurrent.futures import ProcessPoolExecutor
+
+from . import dbd, recordnames, transfer
+from .context import DatabaseContext
+from .recordbase import ImportRecord
+from .recordset import LookupRecord, recordset
+
+__all__ = ["BuildParallel"]
+
+
+# The record naming of the process calling BuildParallel, copied for each
+# builder run by a worker.
+_record_names = None
+
+
+# Each worker starts with the same DBD files and record naming as the process
+# calling BuildParallel.
+def _InitialiseWorker(configuration, record_names):
+    global _record_names
+    dbd._Reconfigure(configuration)  # noqa: SLF001
+    _record_names = record_names
+
+
+# Runs a single builder in a worker process and returns the records it created
+# together with its result.  Each builder runs in a new context with its own
+# copy of the record naming, so nothing a builder does affects the next
+# builder run by the same worker.
+def _RunBuilder(builder):
+    with DatabaseContext(copy.deepcopy(_record_names)) as record_set:
+        result = builder()
+        return transfer.PickleRecordSet(record_set, result)
+
+
+# Resolves a reference to a record outside the set built by a worker, which
+# will normally be a record already created in this process.
+def _LookupExternal(name):
+    try:
+        return LookupRecord(name)
+    except KeyError:
+        return ImportRecord(name)
+
+
+def BuildParallel(builders, max_workers=None, mp_context=None):
+    """Calls each of the given builders in a separate worker process and merges
+    the records created into the current record set, returning the list of
+    results from the builders.
+
+    Each builder must be picklable, and so will normally be a module level
+    function, and must return a picklable result.  The records from each
+    builder are merged in the order the builders are given, and it is an error
+    for two builders to create records with the same name."""
+    with ProcessPoolExecutor(
+        max_workers,
+        mp_context,
+        initializer=_InitialiseWorker,
+        initargs=(dbd._Configuration(), recordnames.GetRecordNames()),  # noqa: SLF001
+    ) as executor:
+        outputs = list(executor.map(_RunBuilder, builders))
+
+    built = [transfer.UnpickleRecordSet(output, _LookupExternal) for output in outputs]
+    recordset.Merge(*(record_set for record_set, _ in built))
+    for record_set, _ in built:
+        transfer.NotifyUse(record_set)
+    return [result for _, result in built]
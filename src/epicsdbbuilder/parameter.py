@@ -1,19 +1,25 @@
+import contextvars
+
 from . import recordset
 
 __all__ = ["Parameter"]
 
 
+# Names of all parameters defined in the current context.
+_default_parameter_names: set[str] = set()
+current_parameter_names = contextvars.ContextVar(
+    "parameter_names", default=_default_parameter_names
+)
+
+
 # A Parameter is used to wrap a template parameter before being assigned to a
 # record field.
 class Parameter:
-    __ParameterNames = set()  # type: ignore
-
     def __init__(self, name, description="", default=None):
         # Ensure names aren't accidentially overwritten
-        assert name not in self.__ParameterNames, (
-            f'Parameter name "{name}" already defined'
-        )
-        self.__ParameterNames.add(name)
+        parameter_names = current_parameter_names.get()
+        assert name not in parameter_names, f'Parameter name "{name}" already defined'
+        parameter_names.add(name)
 
         self.__name = name
         self.__default = default
@@ -22,7 +28,7 @@ class Parameter:
         lines = description.split("\n")
         recordset.recordset.AddHeaderLine(f"#% macro, {name}, {lines[0]}")
         for line in lines[1:]:
-            recordset.AddHeaderLine(f"#  {line}")
+            recordset.recordset.AddHeaderLine(f"#  {line}")
 
     def __str__(self):
         if self.__default is None:
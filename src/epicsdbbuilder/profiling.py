@@ -0,0 +1,261 @@
+"""Optional instrumentation of the time spent in each phase of a build.
+
+When profiling is enabled the time spent loading DBDs, importing the static
+database library, computing record names, validating field values and writing
+records is accumulated, together with the number of records of each type and
+the time spent creating and formatting them, and the number of calls to each
+function in the static database library.
+
+The frequently called methods are only instrumented while profiling is enabled,
+by replacing them with timing wrappers, so there is no overhead otherwise.
+"""
+
+import contextlib
+import functools
+import json
+import time
+
+__all__ = [
+    "EnableProfiling",
+    "ResetProfiling",
+    "ProfilingData",
+    "ProfilingReport",
+    "WriteProfilingData",
+]
+
+
+_enabled = False
+
+# Accumulated [calls, seconds] for each phase of the build, each record type
+# and each library function.
+_phases: dict[str, list] = {}
+_record_types: dict[str, dict[str, list]] = {}
+_library_calls: dict[str, list] = {}
+
+# Original methods replaced while profiling, as (owner, name, method).  The
+# library functions are restored separately as they may be imported while
+# profiling is enabled.
+_originals: list[tuple[type, str, object]] = []
+
+
+def _Accumulate(table, key, elapsed, calls=1):
+    entry = table.get(key)
+    if entry is None:
+        table[key] = [calls, elapsed]
+    else:
+        entry[0] += calls
+        entry[1] += elapsed
+
+
+@contextlib.contextmanager
+def _PhaseTimer(phase):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _Accumulate(_phases, phase, time.perf_counter() - start)
+
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def Timer(phase):
+    """Returns a context manager accumulating the time spent in the given phase
+    while profiling is enabled.  This is for infrequent operations, frequently
+    called methods are wrapped when profiling is enabled."""
+    if _enabled:
+        return _PhaseTimer(phase)
+    else:
+        return _NULL_TIMER
+
+
+def _TimePhase(phase, method):
+    @functools.wraps(method)
+    def timed(*args, **kargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kargs)
+        finally:
+            _Accumulate(_phases, phase, time.perf_counter() - start)
+
+    return timed
+
+
+# Accumulates the time spent by the method for each record type under the
+# given column, counting the records and the time for creating and formatting
+# each record type separately.
+def _TimeRecordType(column, method):
+    @functools.wraps(method)
+    def timed(record, *args, **kargs):
+        start = time.perf_counter()
+        try:
+            return method(record, *args, **kargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _Accumulate(
+                _record_types.setdefault(record._type, {}),  # noqa: SLF001
+                column,
+                elapsed,
+            )
+
+    return timed
+
+
+# Accumulates the time spent creating records in bulk under the create column
+# of the record type, counting each record created.
+def _TimeCreateMany(method):
+    function = method.__func__
+
+    @functools.wraps(function)
+    def timed(cls, names, *args, **kargs):
+        start = time.perf_counter()
+        try:
+            return function(cls, names, *args, **kargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            _Accumulate(
+                _record_types.setdefault(cls._type, {}),  # noqa: SLF001
+                "create",
+                elapsed,
+                len(names),
+            )
+
+    return classmethod(timed)
+
+
+def _TimeLibraryCall(name, function):
+    @functools.wraps(function)
+    def timed(*args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            _Accumulate(_library_calls, name, time.perf_counter() - start)
+
+    return timed
+
+
+def _Replace(owner, name, wrap):
+    method = owner.__dict__[name]
+    _originals.append((owner, name, method))
+    setattr(owner, name, wrap(method))
+
+
+def _Instrument():
+    from . import dbd, mydbstatic, recordbase, recordnames, recordset
+
+    _Replace(
+        dbd.ValidateDbField,
+        "FieldValueError",
+        functools.partial(_TimePhase, "validation"),
+    )
+    _Replace(recordnames, "RecordName", functools.partial(_TimePhase, "RecordName"))
+    _Replace(recordset.RecordSet, "Print", functools.partial(_TimePhase, "Print"))
+    _Replace(
+        recordset.RecordSet,
+        "Validate",
+        functools.partial(_TimePhase, "batch validation"),
+    )
+    _Replace(
+        recordbase.Record, "__init__", functools.partial(_TimeRecordType, "create")
+    )
+    _Replace(recordbase.Record, "_CreateMany", _TimeCreateMany)
+    _Replace(recordbase.Record, "Format", functools.partial(_TimeRecordType, "format"))
+
+    # Library functions are replaced now if already imported, otherwise as
+    # they are imported.
+    for name, _, _, _ in mydbstatic._FunctionList:  # noqa: SLF001
+        function = mydbstatic.__dict__.get(name)
+        if function is not None:
+            setattr(mydbstatic, name, _TimeLibraryCall(name, function))
+    mydbstatic._import_hook = _TimeLibraryCall  # noqa: SLF001
+
+
+def _Uninstrument():
+    from . import mydbstatic
+
+    mydbstatic._import_hook = None  # noqa: SLF001
+    for name, _, _, _ in mydbstatic._FunctionList:  # noqa: SLF001
+        function = mydbstatic.__dict__.get(name)
+        if hasattr(function, "__wrapped__"):
+            setattr(mydbstatic, name, function.__wrapped__)
+    while _originals:
+        owner, name, method = _originals.pop()
+        setattr(owner, name, method)
+
+
+def EnableProfiling(enable=True):
+    """Starts or stops accumulating profiling data, the data accumulated so far
+    is kept until ResetProfiling is called."""
+    global _enabled
+    if enable and not _enabled:
+        _Instrument()
+    elif not enable and _enabled:
+        _Uninstrument()
+    _enabled = enable
+
+
+def ResetProfiling():
+    """Discards all profiling data accumulated so far."""
+    _phases.clear()
+    _record_types.clear()
+    _library_calls.clear()
+
+
+def _Entry(calls, elapsed):
+    return {"calls": calls, "time": elapsed}
+
+
+def ProfilingData():
+    """Returns the profiling data accumulated so far as a dictionary with
+    entries "phases", "record_types" and "library_calls".  Each of these maps
+    names to a dictionary of "calls" and "time" in seconds, except for record
+    types which have a dictionary of these for "create" and "format"."""
+    return {
+        "phases": {phase: _Entry(*entry) for phase, entry in sorted(_phases.items())},
+        "record_types": {
+            record_type: {
+                column: _Entry(*entry) for column, entry in sorted(columns.items())
+            }
+            for record_type, columns in sorted(_record_types.items())
+        },
+        "library_calls": {
+            name: _Entry(*entry) for name, entry in sorted(_library_calls.items())
+        },
+    }
+
+
+def _FormatTable(title, rows):
+    lines = [f"{title:<32} {'calls':>10} {'time (s)':>12}"]
+    for name, entry in sorted(rows, key=lambda row: -row[1]["time"]):
+        lines.append(f"{name:<32} {entry['calls']:>10} {entry['time']:>12.6f}")
+    return lines
+
+
+def ProfilingReport():
+    """Returns a summary of the profiling data as a printable string, with the
+    most expensive entries in each table first."""
+    data = ProfilingData()
+    lines = _FormatTable("Phase", data["phases"].items())
+    lines.append("")
+    lines.extend(
+        _FormatTable(
+            "Record type",
+            [
+                (f"{record_type} ({column})", entry)
+                for record_type, columns in data["record_types"].items()
+                for column, entry in columns.items()
+            ],
+        )
+    )
+    lines.append("")
+    lines.extend(_FormatTable("Library function", data["library_calls"].items()))
+    return "\n".join(lines) + "\n"
+
+
+def WriteProfilingData(filename):
+    """Writes the profiling data returned by ProfilingData to the given file
+    as JSON."""
+    with open(filename, "w") as output:
+        json.dump(ProfilingData(), output, indent=4)
+        output.write("\n")
@@ -1,13 +1,25 @@
 """Support for generating epics records."""
 
 import json
+import re
 import string
-from collections import OrderedDict
 
 from . import recordnames
-from .recordset import recordset
-
-__all__ = ["PP", "CA", "CP", "CPP", "NP", "MS", "MSS", "MSI", "NMS", "ImportRecord"]
+from .recordset import current_record_set, recordset
+
+__all__ = [
+    "PP",
+    "CA",
+    "CP",
+    "CPP",
+    "NP",
+    "MS",
+    "MSS",
+    "MSI",
+    "NMS",
+    "ImportRecord",
+    "CreateRecords",
+]
 
 
 # Quotes a single character if necessary
@@ -20,9 +32,19 @@ def quote_char(ch):
         return ch
 
 
+# Translation table applying quote_char to every character which needs it.
+_QUOTED_CHARS = [*map(chr, range(32)), '"', "\\"]
+_QUOTE_TABLE = str.maketrans({ch: quote_char(ch) for ch in _QUOTED_CHARS})
+_NEEDS_QUOTING = re.compile(r'[\x00-\x1f"\\]')
+
+
 # Converts a string into a safely quoted string with quotation marks
 def quote_string(value):
-    return '"' + "".join(map(quote_char, value)) + '"'
+    # Most strings need no escaping, and searching for the few characters that
+    # do is much faster than translating the string.
+    if _NEEDS_QUOTING.search(value):
+        value = value.translate(_QUOTE_TABLE)
+    return f'"{value}"'
 
 
 # ---------------------------------------------------------------------------
@@ -34,7 +56,13 @@ def quote_string(value):
 #
 # All record types known to the IOC builder (loaded from DBD files in EPICS
 # support modules) are subclasses of this class.
+#
+# Very large numbers of records can be generated, so they are stored compactly:
+# field values are stored by DBD field index, and aliases, comments and infos
+# are only allocated when used.
 class Record:
+    __slots__ = ("name", "__fields", "__aliases", "__comments", "__infos")
+
     # Creates a subclass of the record with the given record type and
     # validator bound to the subclass.  The device used to load the record is
     # remembered so that it can subsequently be instantiated if necessary.
@@ -43,6 +71,7 @@ class Record:
         # Each record we publish is a class so that individual record
         # classes can be subclassed when convenient.
         class BuildRecord(Record):
+            __slots__ = ()
             _validate = validate
             _type = record_type
             _on_use = on_use
@@ -56,11 +85,10 @@ class Record:
 
     def __setattr(self, name, value):
         # Because we have hooked into __setattr__, we need to dance a little
-        # to write names into our dictionary.
+        # to write names into our slots.
         if name[:2] == "__":
-            self.__dict__["_Record" + name] = value
-        else:
-            self.__dict__[name] = value
+            name = "_Record" + name
+        object.__setattr__(self, name, value)
 
     # Record constructor.  Needs to be told the type of record that this will
     # be, a field validation object (which will be used to check field names
@@ -105,20 +133,7 @@ class Record:
         if self._on_use:
             self._on_use(self)
 
-        # These assignment have to be directly into the dictionary to
-        # bypass the tricksy use of __setattr__.
-        self.__setattr("__fields", OrderedDict())
-        self.__setattr("__aliases", OrderedDict())
-        self.__setattr("__comments", [])
-        self.__setattr("__infos", [])
-        self.__setattr("name", recordnames.RecordName(record))
-
-        # Support the special 'address' field as an alias for either INP or
-        # OUT, depending on which of those exists.  We only set up this field
-        # if exactly one of INP or OUT is present as a valid field.
-        address = [field for field in ["INP", "OUT"] if self.ValidFieldName(field)]
-        if len(address) == 1:
-            self.__setattr("__address", address[0])
+        self.__Initialise(recordnames.RecordName(record))
 
         # Make sure all the fields are properly processed and validated.
         for name, value in fields.items():
@@ -126,54 +141,200 @@ class Record:
 
         recordset.PublishRecord(self.name, self)
 
+    def __Initialise(self, name):
+        # These assignment have to bypass the tricksy use of __setattr__, and
+        # are written out in full as this is called for every record.  The
+        # aliases, comments and infos are created when first needed.
+        object.__setattr__(self, "_Record__fields", {})
+        object.__setattr__(self, "_Record__aliases", None)
+        object.__setattr__(self, "_Record__comments", None)
+        object.__setattr__(self, "_Record__infos", None)
+        object.__setattr__(self, "name", name)
+
+    # Support the special 'address' field as an alias for either INP or OUT,
+    # depending on which of those exists.  This field is only available if
+    # exactly one of INP or OUT is present as a valid field.
+    @classmethod
+    def __Address(cls):
+        address = [field for field in ["INP", "OUT"] if cls.ValidFieldName(field)]
+        if len(address) != 1:
+            raise AttributeError("Invalid field name address")
+        return address[0]
+
+    # Returns the DBD index of the given field name, raises an attribute error
+    # if the field name is invalid.
+    def __FieldIndex(self, fieldname):
+        if fieldname == "address":
+            fieldname = self.__Address()
+        return self._validate.GetFieldInfo(fieldname).index
+
+    # Creates an empty record of this type with the given name without
+    # publishing it, used when records are transferred between processes.
+    @classmethod
+    def _CreateEmpty(cls, name):
+        record = cls.__new__(cls)
+        record.__Initialise(name)  # noqa: SLF001
+        return record
+
+    # Creates and publishes a record of this type for each name, with the
+    # values of each field given as a list of values, one for each record, or
+    # a single value for all records.  All values are checked before any
+    # record is created, and each distinct value of each field is validated
+    # once.
+    @classmethod
+    def _CreateMany(cls, names, fields):
+        columns = []
+        for fieldname, values in fields.items():
+            if fieldname == "address":
+                fieldname = cls.__Address()
+            index = cls._validate.GetFieldInfo(fieldname).index
+            if _IsColumn(values):
+                values = values.tolist() if hasattr(values, "tolist") else values
+                assert len(values) == len(names), (
+                    f"{len(values)} values given for field {fieldname} "
+                    f"of {len(names)} records"
+                )
+                values = [value() if callable(value) else value for value in values]
+                distinct = values
+            else:
+                if callable(values):
+                    values = values()
+                distinct = [values]
+                values = distinct * len(names)
+            columns.append((fieldname, index, values, distinct))
+
+        # Values which validate themselves need the record, so are checked
+        # once the records exist.
+        self_validating = []
+        if not current_record_set.get().defer_validation:
+            for fieldname, _, values, distinct in columns:
+                checked = set()
+                for n, value in enumerate(distinct):
+                    if value is None or getattr(value, "ValidateLater", False):
+                        continue
+                    if hasattr(value, "Validate"):
+                        if distinct is values:
+                            self_validating.append((n, fieldname, value))
+                        else:
+                            self_validating.extend(
+                                (n, fieldname, value) for n in range(len(names))
+                            )
+                        continue
+                    text = str(value)
+                    if text not in checked:
+                        message = cls._validate.FieldValueError(fieldname, text)
+                        assert message is None, (
+                            f"{names[n]}: Can't write '{text}' to field "
+                            f"{fieldname}: {message}"
+                        )
+                        checked.add(text)
+
+        records = []
+        for n, name in enumerate(names):
+            record = cls.__new__(cls)
+            record.__Initialise(recordnames.RecordName(name))  # noqa: SLF001
+            record_fields = record.__fields  # noqa: SLF001
+            for _, index, values, _ in columns:
+                value = values[n]
+                if value is not None:
+                    record_fields[index] = value
+            records.append(record)
+        for n, fieldname, value in self_validating:
+            value.Validate(records[n], fieldname)
+        recordset.PublishRecords(records)
+
+        # The on_use hook is only called once every record has been published,
+        # and is called in the same way as by __init__.
+        if cls._on_use:
+            for record in records:
+                record._on_use(record)  # noqa: SLF001
+        return records
+
+    # Returns the complete contents of this record other than its type and
+    # name, with fields keyed by their DBD field index.  Field values are not
+    # copied.
+    def _GetState(self):
+        return (
+            dict(self.__fields),
+            list(self.__aliases or ()),
+            list(self.__comments or ()),
+            list(self.__infos or ()),
+        )
+
+    # Restores the state returned by _GetState, the field values are assumed
+    # to have already been validated.
+    def _SetState(self, state):
+        fields, aliases, comments, infos = state
+        self.__fields.update(fields)
+        for alias in aliases:
+            self.add_alias(alias)
+        for comment in comments:
+            self.__AddComment(comment)
+        for name, info in infos:
+            self.add_info(name, info)
+
     def add_alias(self, alias):
-        self.__aliases[alias] = self
+        if self.__aliases is None:
+            self.__setattr("__aliases", {})
+        self.__aliases[alias] = None
+
+    def __AddComment(self, comment):
+        if self.__comments is None:
+            self.__setattr("__comments", [])
+        self.__comments.append(comment)
 
     def add_comment(self, comment):
-        self.__comments.append("# " + comment)
+        self.__AddComment("# " + comment)
 
     def add_metadata(self, metadata):
-        self.__comments.append("#% " + metadata)
+        self.__AddComment("#% " + metadata)
 
     def add_info(self, name, info):
+        if self.__infos is None:
+            self.__setattr("__infos", [])
         self.__infos.append((name, info))
 
-    def __dbd_order(self, fields):
-        field_set = set(fields)
-        for field_name in self._validate.dbEntry.iterate_fields():
-            if field_name in field_set:
-                yield field_name
-                field_set.remove(field_name)
-        assert not field_set, (
-            f"DBD for {self._type} doesn't contain {sorted(field_set)}"
-        )
-
     # Call to generate database description of this record.  Outputs record
     # definition in .db file format.  Hooks for meta-data can go here.
     def Print(self, output, alphabetical=True):
-        print(file=output)
-        for comment in self.__comments:
-            print(comment, file=output)
-        print(f'record({self._type}, "{self.name}")', file=output)
-        print("{", file=output)
+        output.write(self.Format(alphabetical))
+
+    # Returns the database description of this record as a single string, as
+    # written by Print.
+    def Format(self, alphabetical=True):
+        lines = ["\n"]
+        for comment in self.__comments or ():
+            lines.append(f"{comment}\n")
+        lines.append(f'record({self._type}, "{self.name}")\n{{\n')
         # Print the fields in alphabetical order.  This is more convenient
         # to the eye and has the useful side effect of bypassing a bug
         # where DTYPE needs to be specified before INP or OUT fields.
-        sort = sorted if alphabetical else self.__dbd_order
-        for k in sort(self.__fields.keys()):
-            value = self.__fields[k]
-            if getattr(value, "ValidateLater", False):
-                self.__ValidateField(k, value)
-            value = self.__FormatFieldForDb(k, value)
-            padding = "".ljust(4 - len(k))  # To align field values
-            print(f"    field({k}, {padding}{value})", file=output)
+        # Otherwise the fields are printed in DBD order, the order of their
+        # indexes.  The alphabetical rank of each field index is computed once
+        # for each record type.
+        fields = self.__fields
+        if fields:
+            names = self._validate.FieldNames()
+            if alphabetical:
+                order = sorted(fields, key=self._validate.FieldRanks().__getitem__)
+            else:
+                order = sorted(fields)
+            for index in order:
+                k = names[index]
+                value = fields[index]
+                if getattr(value, "ValidateLater", False):
+                    self.__ValidateField(k, value)
+                value = self.__FormatFieldForDb(k, value)
+                padding = " " * (4 - len(k))  # To align field values
+                lines.append(f"    field({k}, {padding}{value})\n")
         sort = sorted if alphabetical else list
-        for alias in sort(self.__aliases.keys()):
-            print(f'    alias("{alias}")', file=output)
-        for name, info in self.__infos:
+        for alias in sort(self.__aliases or ()):
+            lines.append(f'    alias("{alias}")\n')
+        for name, info in self.__infos or ():
             value = self.__FormatFieldForDb(name, info)
-            print(f"    info({name}, {value})", file=output)
-        print("}", file=output)
+            lines.append(f"    info({name}, {value})\n")
+        lines.append("}\n")
+        return "".join(lines)
 
     # The string for a record is just its name.
     def __str__(self):
@@ -191,22 +352,28 @@ class Record:
     # Assigning to a record attribute updates a field.
     def __setattr__(self, fieldname, value):
         if fieldname == "address":
-            fieldname = self.__address
+            fieldname = self.__Address()
         if value is None:
             # Treat assigning None to a field the same as deleting that field.
-            # This is convenient for default arguments.
-            if fieldname in self.__fields:
-                del self.__fields[fieldname]
+            # This is convenient for default arguments.  Assigning None to a
+            # name which is not a field is silently ignored.
+            info = self._validate.Fields().get(fieldname)
+            if info is not None:
+                self.__fields.pop(info.index, None)
         else:
+            index = self.__FieldIndex(fieldname)
             # If the field is callable we call it first: this is used to
             # ensure we convert record pointers into links.  It's unlikely
             # that this will have unfortunate side effects elsewhere, but it's
             # always possible...
             if callable(value):
                 value = value()
-            if not getattr(value, "ValidateLater", False):
+            if not (
+                getattr(value, "ValidateLater", False)
+                or current_record_set.get().defer_validation
+            ):
                 self.__ValidateField(fieldname, value)
-            self.__fields[fieldname] = value
+            self.__fields[index] = value
 
     # Field validation
     def __ValidateField(self, fieldname, value):
@@ -218,6 +385,25 @@ class Record:
         else:
             self._validate.ValidFieldValue(fieldname, str(value))
 
+    # Adds the field values of this record to be validated to groups, keyed by
+    # validator and field name, of the names of the records with each value.
+    # Values validating themselves are checked now, adding any failures to
+    # errors, and values validated later are left for formatting.
+    def _CollectValidation(self, groups, errors):
+        names = self._validate.FieldNames()
+        for index, value in self.__fields.items():
+            fieldname = names[index]
+            if getattr(value, "ValidateLater", False):
+                pass
+            elif hasattr(value, "Validate"):
+                try:
+                    value.Validate(self, fieldname)
+                except AssertionError as error:
+                    errors.append(f"{self.name}.{fieldname}: {error}")
+            else:
+                values = groups.setdefault((self._validate, fieldname), {})
+                values.setdefault(str(value), []).append(self.name)
+
     # Field formatting
     def __FormatFieldForDb(self, fieldname, value):
         if hasattr(value, "FormatDb"):
@@ -231,19 +417,22 @@ class Record:
 
     # Allow individual fields to be deleted from the record.
     def __delattr__(self, fieldname):
-        if fieldname == "address":
-            fieldname = self.__address
-        del self.__fields[fieldname]
+        del self.__fields[self.__FieldIndex(fieldname)]
 
     # Reading a record attribute returns a link to the field.
     def __getattr__(self, fieldname):
         if fieldname == "address":
-            fieldname = self.__address
+            fieldname = self.__Address()
         self._validate.ValidFieldName(fieldname)
         return _Link(self, fieldname)
 
     def _FieldValue(self, fieldname):
-        return self.__fields[fieldname]
+        return self.__fields[self.__FieldIndex(fieldname)]
+
+    # Returns the (index, value) pairs of the fields which have been set,
+    # indexed by DBD field index.
+    def _FieldItems(self):
+        return self.__fields.items()
 
     # Can be called to validate the given field name, returns True iff this
     # record type supports the given field name.
@@ -263,7 +452,28 @@ class Record:
     # instance.  This makes more sense (as the record has been fully generated
     # already), and avoids a lot of trouble.
     def __reduce__(self):
-        return (ImportRecord, (self.name, self._type))
+        return (ImportRecord, (self.name,))
+
+
+# Field values given to CreateRecords as lists, tuples or one dimensional
+# arrays hold a value for each record, anything else is the value of every
+# record.
+def _IsColumn(values):
+    return isinstance(values, (list, tuple)) or getattr(values, "ndim", 0) == 1
+
+
+def CreateRecords(record_type, names, **fields):
+    """Creates a record of the given type, a record class from records or the
+    name of a record type, for each of the given names and returns the list of
+    records.  Each field is given either a list, tuple or array of values with
+    one value for each record, or a single value for every record, and a None
+    value leaves the field unset.  Each distinct value of each field is only
+    validated once, and either all the records are created or none are."""
+    if isinstance(record_type, str):
+        from .dbd import records
+
+        record_type = getattr(records, record_type)
+    return record_type._CreateMany(list(names), fields)  # noqa: SLF001
 
 
 # Records can be imported by name.  An imported record has no specification
@@ -1,5 +1,7 @@
 """Support for default record name configurations."""
 
+import contextvars
+
 from . import parameter
 
 __all__ = [
@@ -69,36 +71,45 @@ def SetTemplateRecordNames(prefix=None, separator=":"):
 
 
 # By default record names are unmodified.
-def _RecordNames(name):
+def _DefaultRecordNames(name):
     return name
 
 
+# The record naming of the current context.  This is held in a list so that
+# SetRecordNames affects everything sharing the context, in particular the
+# default context is shared by all threads.
+_default_record_names = [_DefaultRecordNames]
+current_record_names = contextvars.ContextVar(
+    "record_names", default=_default_record_names
+)
+
+
 def SetRecordNames(names):
-    global _RecordNames
-    current = _RecordNames
-    _RecordNames = names
+    record_names = current_record_names.get()
+    current = record_names[0]
+    record_names[0] = names
     return current
 
 
 def GetRecordNames():
-    return _RecordNames
+    return current_record_names.get()[0]
 
 
 def RecordName(name):
-    return _RecordNames(name)
+    return current_record_names.get()[0](name)
 
 
 def PushPrefix(prefix):
-    _RecordNames.PushPrefix(prefix)
+    GetRecordNames().PushPrefix(prefix)
 
 
 def PopPrefix():
-    return _RecordNames.PopPrefix()
+    return GetRecordNames().PopPrefix()
 
 
 def SetPrefix(prefix):
-    _RecordNames.SetPrefix(prefix)
+    GetRecordNames().SetPrefix(prefix)
 
 
 def SetSeparator(separator):
-    _RecordNames.SetSeparator(separator)
+    GetRecordNames().SetSeparator(separator)
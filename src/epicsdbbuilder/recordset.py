@@ -1,10 +1,102 @@
 """Collections of records."""
 
+import bisect
+import contextvars
+import fnmatch
+import io
 import os
+import re
 import time
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
-__all__ = ["WriteRecords", "Disclaimer", "LookupRecord", "CountRecords", "ResetRecords"]
+__all__ = [
+    "WriteRecords",
+    "WriteShardedRecords",
+    "Disclaimer",
+    "LookupRecord",
+    "CountRecords",
+    "FindRecords",
+    "CountRecordsByType",
+    "CountRecordsByPrefix",
+    "ResetRecords",
+    "DeferValidation",
+    "ValidateRecords",
+]
+
+
+# Default amount of output accumulated before writing to the output file.
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+# Accumulates text written to it and passes it on to the output file in large
+# chunks, which is a lot cheaper than writing each line as it is generated.
+class _BufferedWriter:
+    def __init__(self, output, buffer_size=DEFAULT_BUFFER_SIZE):
+        self.output = output
+        self.buffer_size = buffer_size
+        self.__buffer = []
+        self.__length = 0
+
+    def write(self, text):
+        self.__buffer.append(text)
+        self.__length += len(text)
+        if self.__length >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self.__buffer:
+            self.output.write("".join(self.__buffer))
+            self.__buffer = []
+            self.__length = 0
+
+
+# Returns the smallest string greater than every string starting with prefix,
+# which must not be empty.
+def _PrefixEnd(prefix):
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+# Index of record names for prefix queries, and of the names of each record
+# type.  The names are kept in a list which is only sorted when queried after
+# new names are added, so publishing a record remains cheap and sorting names
+# which were mostly published in order is fast.  A prefix selects a contiguous
+# range of the sorted names, found by bisection, so prefixes can be counted
+# without visiting the matching records.
+class _NameIndex:
+    def __init__(self):
+        self.__names = []
+        self.__sorted = True
+        self.__types = {}
+
+    def Add(self, name, record_type):
+        names = self.__names
+        if names and self.__sorted and name < names[-1]:
+            self.__sorted = False
+        names.append(name)
+        self.__types.setdefault(record_type, []).append(name)
+
+    # Returns the sorted names.
+    def Names(self):
+        if not self.__sorted:
+            self.__names.sort()
+            self.__sorted = True
+        return self.__names
+
+    # Returns the range of indexes in Names() of names starting with prefix.
+    def Range(self, prefix):
+        names = self.Names()
+        if not prefix:
+            return 0, len(names)
+        start = bisect.bisect_left(names, prefix)
+        return start, bisect.bisect_left(names, _PrefixEnd(prefix), start)
+
+    # Returns the names of records of the given type in publication order.
+    def TypeNames(self, record_type):
+        return self.__types.get(record_type, ())
+
+    def TypeCounts(self):
+        return {record_type: len(names) for record_type, names in self.__types.items()}
 
 
 class RecordSet:
@@ -12,49 +104,267 @@ class RecordSet:
         self.__RecordSet = OrderedDict()
         self.__HeaderLines = []
         self.__BodyLines = []
+        self.__Index = _NameIndex()
 
     def __init__(self):
+        # When this is set field values are not validated as they are assigned
+        # but together by Validate, which is called before printing.
+        self.defer_validation = False
         self.ResetRecords()
 
     # Add a record to the list of records to be published.
     def PublishRecord(self, name, record):
         assert name not in self.__RecordSet, f"Record {name} already defined"
         self.__RecordSet[name] = record
+        self.__Index.Add(name, record._type)  # noqa: SLF001
+
+    # Adds a list of records to be published in a single pass.  Either all
+    # of the records are added or, if any name is already defined, none are.
+    def PublishRecords(self, records):
+        names = set()
+        duplicates = set()
+        for record in records:
+            if record.name in names or record.name in self.__RecordSet:
+                duplicates.add(record.name)
+            names.add(record.name)
+        assert not duplicates, f"Records {sorted(duplicates)} already defined"
+        for record in records:
+            self.__RecordSet[record.name] = record
+            self.__Index.Add(record.name, record._type)  # noqa: SLF001
 
     # Returns the record with the given name.
     def LookupRecord(self, full_name):
         return self.__RecordSet[full_name]
 
-    # Output complete set of records to the given file.
-    def Print(self, output, alphabetical):
+    # Returns the records whose names start with prefix, match the glob style
+    # pattern and are of the given record type, in name order.  Arguments which
+    # are not given are not used to select records.
+    def FindRecords(self, prefix="", pattern=None, record_type=None):
+        if pattern is not None:
+            # The literal start of the pattern narrows the names to search
+            literal = re.match(r"[^*?[]*", pattern)[0]
+            if literal.startswith(prefix):
+                prefix = literal
+            elif not prefix.startswith(literal):
+                return []
+            match = re.compile(fnmatch.translate(pattern)).match
+
+        if record_type is not None and not prefix:
+            names = sorted(self.__Index.TypeNames(record_type))
+        else:
+            start, end = self.__Index.Range(prefix)
+            names = self.__Index.Names()[start:end]
+        if pattern is not None:
+            names = [name for name in names if match(name)]
+
+        records = [self.__RecordSet[name] for name in names]
+        if record_type is not None and prefix:
+            records = [
+                record
+                for record in records
+                if record._type == record_type  # noqa: SLF001
+            ]
+        return records
+
+    # Output complete set of records to the given file.  The output is
+    # written in chunks of around buffer_size characters.
+    def Print(self, output, alphabetical, buffer_size=DEFAULT_BUFFER_SIZE):
+        if self.defer_validation:
+            self.Validate()
+        writer = _BufferedWriter(output, buffer_size)
         for line in self.__HeaderLines:
-            print(line, file=output)
+            writer.write(f"{line}\n")
         if self.__BodyLines:
-            print(file=output)
+            writer.write("\n")
             for line in self.__BodyLines:
-                print(line, file=output)
+                writer.write(f"{line}\n")
         # Print the records in alphabetical order: gives the reader a fighting
         # chance to find their way around the generated database!
         sort = sorted if alphabetical else list
         for record in sort(self.__RecordSet):
-            self.__RecordSet[record].Print(output, alphabetical)
+            writer.write(self.__RecordSet[record].Format(alphabetical))
+        writer.flush()
+
+    # Returns the formatted records divided into shards, each a list of
+    # strings, generated one shard at a time.  A new shard is started when
+    # adding a record would exceed max_records or max_size characters, and if
+    # by_prefix is set for each name prefix up to the first separator.
+    def Shards(
+        self,
+        alphabetical,
+        max_records=None,
+        max_size=None,
+        by_prefix=False,
+        separator=":",
+    ):
+        if self.defer_validation:
+            self.Validate()
+        names = sorted(self.__RecordSet) if alphabetical else list(self.__RecordSet)
+        if by_prefix:
+            groups = {}
+            for name in names:
+                groups.setdefault(name.split(separator, 1)[0], []).append(name)
+            groups = groups.values()
+        else:
+            groups = [names]
+
+        for group in groups:
+            shard = []
+            size = 0
+            for name in group:
+                text = self.__RecordSet[name].Format(alphabetical)
+                if shard and (
+                    (max_records is not None and len(shard) >= max_records)
+                    or (max_size is not None and size + len(text) > max_size)
+                ):
+                    yield shard
+                    shard = []
+                    size = 0
+                shard.append(text)
+                size += len(text)
+            if shard:
+                yield shard
+
+    # Validates the field values of all records in one pass.  Field values are
+    # grouped by record type and field, so each distinct value is only checked
+    # once, and every invalid value is reported together.
+    def Validate(self):
+        groups = {}
+        errors = []
+        for record in self.__RecordSet.values():
+            record._CollectValidation(groups, errors)  # noqa: SLF001
+        for (validate, fieldname), values in groups.items():
+            for value, names in values.items():
+                message = validate.FieldValueError(fieldname, value)
+                if message is not None:
+                    errors.extend(
+                        f"{name}.{fieldname}: can't write '{value}': {message}"
+                        for name in names
+                    )
+        assert not errors, "\n".join([f"{len(errors)} invalid fields:", *errors])
 
     # Returns the number of published records.
     def CountRecords(self):
         return len(self.__RecordSet)
 
+    # Returns a dictionary of the number of published records of each type.
+    def CountRecordsByType(self):
+        return self.__Index.TypeCounts()
+
+    # Returns a dictionary of the number of published records for each prefix
+    # formed by the first depth components of the record names, split by the
+    # separator.  A name with fewer components is counted under its full name.
+    # Each prefix is counted with a single bisection of the sorted names.
+    def CountRecordsByPrefix(self, separator=":", depth=1):
+        names = self.__Index.Names()
+        counts = {}
+        index = 0
+        while index < len(names):
+            name = names[index]
+            parts = name.split(separator, depth)
+            if len(parts) > depth:
+                prefix = separator.join(parts[:depth])
+                _, end = self.__Index.Range(prefix + separator)
+            else:
+                prefix = name
+                end = index + 1
+            counts[prefix] = counts.get(prefix, 0) + end - index
+            index = end
+        return counts
+
+    # Returns a list of all published records in publication order.
+    def Records(self):
+        return list(self.__RecordSet.values())
+
     def AddHeaderLine(self, line):
         self.__HeaderLines.append(line)
 
     def AddBodyLine(self, line):
         self.__BodyLines.append(line)
 
+    def HeaderLines(self):
+        return list(self.__HeaderLines)
+
+    def BodyLines(self):
+        return list(self.__BodyLines)
+
+    # Adds the contents of the given record sets to this one, in the order
+    # given.  No records are added if any record name is defined more than
+    # once.  Header lines already present are not repeated, as these are
+    # typically parameter definitions.
+    def Merge(self, *record_sets):
+        names = set(self.__RecordSet)
+        duplicates = set()
+        for record_set in record_sets:
+            new_names = [record.name for record in record_set.Records()]
+            duplicates.update(names.intersection(new_names))
+            names.update(new_names)
+        assert not duplicates, f"Records {sorted(duplicates)} already defined"
+
+        for record_set in record_sets:
+            for record in record_set.Records():
+                self.__RecordSet[record.name] = record
+                self.__Index.Add(record.name, record._type)  # noqa: SLF001
+            for line in record_set.HeaderLines():
+                if line not in self.__HeaderLines:
+                    self.__HeaderLines.append(line)
+            self.__BodyLines.extend(record_set.BodyLines())
+
+
+# The record set used by the module level functions.  This is shared by all
+# threads and tasks unless replaced in the current context by DatabaseContext.
+_default_record_set = RecordSet()
+current_record_set = contextvars.ContextVar("record_set", default=_default_record_set)
+
+
+# Forwards everything to the record set of the current context.
+class _CurrentRecordSet:
+    def __getattr__(self, name):
+        return getattr(current_record_set.get(), name)
+
+
+recordset = _CurrentRecordSet()
 
-recordset = RecordSet()
 
-LookupRecord = recordset.LookupRecord
-CountRecords = recordset.CountRecords
-ResetRecords = recordset.ResetRecords
+def LookupRecord(full_name):
+    return current_record_set.get().LookupRecord(full_name)
+
+
+def CountRecords():
+    return current_record_set.get().CountRecords()
+
+
+def FindRecords(prefix="", pattern=None, record_type=None):
+    return current_record_set.get().FindRecords(prefix, pattern, record_type)
+
+
+def CountRecordsByType():
+    return current_record_set.get().CountRecordsByType()
+
+
+def CountRecordsByPrefix(separator=":", depth=1):
+    return current_record_set.get().CountRecordsByPrefix(separator, depth)
+
+
+def ResetRecords():
+    current_record_set.get().ResetRecords()
+
+
+def DeferValidation(defer=True):
+    record_set = current_record_set.get()
+    record_set.defer_validation = defer
+    if not defer:
+        record_set.Validate()
+
+
+def ValidateRecords():
+    current_record_set.get().Validate()
+
+
+_GENERATED_ON = "This file was automatically generated on "
+
+# Matches the timestamp in the header generated by Disclaimer.
+_TIMESTAMP = re.compile(f"^(# {_GENERATED_ON}).*?( from|\\.)$", re.MULTILINE)
 
 
 def Disclaimer(source=None, normalise_source=True):
@@ -67,7 +377,7 @@ def Disclaimer(source=None, normalise_source=True):
 
     now = time.strftime("%a %d %b %Y %H:%M:%S %Z")
     message = f"""\
-This file was automatically generated on {now}{from_source}
+{_GENERATED_ON}{now}{from_source}
 
 *** Please do not edit this file: edit the source file instead. ***
 
@@ -75,12 +385,113 @@ This file was automatically generated on {now}{from_source}
     return message
 
 
-def WriteRecords(filename, header=None, alphabetical=True):
+# Returns the file contents with any Disclaimer timestamp removed.
+def _WithoutTimestamp(text):
+    return _TIMESTAMP.sub(r"\1\2", text)
+
+
+# Returns the contents of the file, or None if it can't be read.
+def _ReadFile(filename):
+    try:
+        with open(filename) as existing:
+            return existing.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+# Converts a header passed to WriteRecords to comment lines.
+def _HeaderComments(header):
     if header is None:
         header = Disclaimer()
     header = header.split("\n")
     assert header[-1] == "", "Terminate header with empty line"
+    return "".join(f"# {line}\n" for line in header[:-1])
+
+
+def WriteRecords(
+    filename,
+    header=None,
+    alphabetical=True,
+    buffer_size=DEFAULT_BUFFER_SIZE,
+    incremental=False,
+):
+    header = _HeaderComments(header)
+
+    if not incremental:
+        with open(filename, "w") as output:
+            output.write(header)
+            recordset.Print(output, alphabetical, buffer_size)
+        return True
+
+    # Only write the file if it differs from the file already there, which is
+    # compared directly so that changes made by any other writer are seen.
+    output = io.StringIO()
+    output.write(header)
+    recordset.Print(output, alphabetical, buffer_size)
+    text = output.getvalue()
+    existing = _ReadFile(filename)
+    if existing is not None and _WithoutTimestamp(existing) == _WithoutTimestamp(text):
+        return False
+
+    with open(filename, "w") as output:
+        output.write(text)
+    return True
+
+
+def _WriteShard(filename, header, shard):
+    with open(filename, "w") as output:
+        output.write(header)
+        output.write("".join(shard))
+
+
+def WriteShardedRecords(
+    filename,
+    header=None,
+    alphabetical=True,
+    max_records=None,
+    max_size=None,
+    by_prefix=False,
+    separator=":",
+    max_workers=None,
+):
+    # The shards are named after the index file, which includes them in order
+    # followed by the header and body lines.  Records are formatted here one
+    # shard at a time and each shard is written by a pool of threads while
+    # the next is formatted.
+    header = _HeaderComments(header)
+    base, extension = os.path.splitext(filename)
+    record_set = current_record_set.get()
+    shards = record_set.Shards(
+        alphabetical, max_records, max_size, by_prefix, separator
+    )
+    shard_files = []
+    with ThreadPoolExecutor(max_workers) as executor:
+        writes = []
+        for number, shard in enumerate(shards, 1):
+            shard_file = f"{base}-{number:03d}{extension}"
+            shard_files.append(shard_file)
+            writes.append(executor.submit(_WriteShard, shard_file, header, shard))
+        for write in writes:
+            write.result()
+
+    # Remove any further shards left by an earlier run which wrote more.
+    number = len(shard_files) + 1
+    while True:
+        shard_file = f"{base}-{number:03d}{extension}"
+        if not os.path.isfile(shard_file):
+            break
+        os.unlink(shard_file)
+        number += 1
+
     with open(filename, "w") as output:
-        for line in header[:-1]:
-            print("#", line, file=output)
-        recordset.Print(output, alphabetical)
+        output.write(header)
+        for line in record_set.HeaderLines():
+            output.write(f"{line}\n")
+        output.write("\n")
+        for shard_file in shard_files:
+            output.write(f'include "{os.path.basename(shard_file)}"\n')
+        if record_set.BodyLines():
+            output.write("\n")
+            for line in record_set.BodyLines():
+                output.write(f"{line}\n")
+    return shard_files
@@ -0,0 +1,188 @@
+"""Support for transferring complete record sets between processes.
+
+A record set is pickled together with the state of each of its records.  Any
+reference to a record in the set, for instance as the target of a link, is
+pickled by name and type and resolved to the corresponding new record when the
+set is loaded, while references to records outside the set are resolved by
+name when loading.  Records are recreated as instances of the record class for
+their type from the loaded DBDs, so any subclassing is lost.
+
+The same format is used to save a built record set to a file so that it can be
+loaded again by a later stage of a build without rerunning the build script.
+"""
+
+import gc
+import io
+import pickle
+
+from .dbd import records
+from .recordbase import ImportRecord, Record
+from .recordset import RecordSet, recordset
+
+__all__ = ["SaveRecords", "LoadRecords"]
+
+
+# Identifies files written by SaveRecords, the version is incremented whenever
+# the format changes.
+_SNAPSHOT_MAGIC = b"epicsdbbuilder records\n"
+_SNAPSHOT_VERSION = 1
+
+
+class _RecordPickler(pickle.Pickler):
+    def __init__(self, file, record_set):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.__Records = {id(record) for record in record_set.Records()}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, Record):
+            return None
+        elif id(obj) in self.__Records:
+            return ("record", obj._type, obj.name)  # noqa: SLF001
+        else:
+            return ("external", obj.name)
+
+
+class _RecordUnpickler(pickle.Unpickler):
+    def __init__(self, file, lookup):
+        pickle.Unpickler.__init__(self, file)
+        self.__Lookup = lookup
+        self.__Records = {}
+
+    def persistent_load(self, pid):
+        if pid[0] == "record":
+            _, record_type, name = pid
+            record = self.__Records.get(name)
+            if record is None:
+                record_class = getattr(records, record_type)
+                record = record_class._CreateEmpty(name)  # noqa: SLF001
+                self.__Records[name] = record
+            return record
+        else:
+            return self.__Lookup(pid[1])
+
+
+# Field values are saved by DBD field index, so the field names of each record
+# type are saved with them to check that the same DBD definitions are loaded.
+def _FieldNames(record_states):
+    return {
+        record._type: record._validate.FieldNames()  # noqa: SLF001
+        for record, _ in record_states
+    }
+
+
+# Converts the field indexes in the saved states of records of any type whose
+# fields are not in the same order as when the records were saved.
+def _RemapFields(record_states, field_names):
+    remap = {}
+    for record_type, names in field_names.items():
+        validate = getattr(records, record_type)._validate  # noqa: SLF001
+        if validate.FieldNames() != names:
+            remap[record_type] = [
+                validate.GetFieldInfo(name).index
+                if validate.ValidFieldName(name)
+                else None
+                for name in names
+            ]
+    if not remap:
+        return
+
+    for record, (fields, _, _, _) in record_states:
+        indexes = remap.get(record._type)  # noqa: SLF001
+        if indexes is not None:
+            remapped = {}
+            for index, value in fields.items():
+                assert indexes[index] is not None, (
+                    f"Field {field_names[record._type][index]} of record "  # noqa: SLF001
+                    f"{record.name} not defined in loaded DBD"
+                )
+                remapped[indexes[index]] = value
+            fields.clear()
+            fields.update(remapped)
+
+
+def PickleRecordSet(record_set, extra=None):
+    """Returns the contents of the record set as a string of bytes.  Any extra
+    picklable data can be added, references to records will be preserved."""
+    record_states = [
+        (record, record._GetState())  # noqa: SLF001
+        for record in record_set.Records()
+    ]
+    file = io.BytesIO()
+    _RecordPickler(file, record_set).dump(
+        (
+            _FieldNames(record_states),
+            record_states,
+            record_set.HeaderLines(),
+            record_set.BodyLines(),
+            extra,
+        )
+    )
+    return file.getvalue()
+
+
+def UnpickleRecordSet(data, lookup=ImportRecord):
+    """Returns a new RecordSet and the extra data from the output of
+    PickleRecordSet.  References to records outside the original set are
+    passed to lookup, which defaults to creating an ImportRecord."""
+    # Loading creates many objects and no garbage, so the collector is paused
+    # rather than repeatedly scanning all the new objects.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        unpickler = _RecordUnpickler(io.BytesIO(data), lookup)
+        field_names, record_states, header_lines, body_lines, extra = unpickler.load()
+    finally:
+        if enabled:
+            gc.enable()
+    _RemapFields(record_states, field_names)
+    record_set = RecordSet()
+    for record, state in record_states:
+        record._SetState(state)  # noqa: SLF001
+        record_set.PublishRecord(record.name, record)
+    for line in header_lines:
+        record_set.AddHeaderLine(line)
+    for line in body_lines:
+        record_set.AddBodyLine(line)
+    return record_set, extra
+
+
+def NotifyUse(record_set):
+    """Calls the on_use hook passed to LoadDbdFile for each record in the set,
+    as happens when a record is created."""
+    for record in record_set.Records():
+        if record._on_use:  # noqa: SLF001
+            record._on_use(record)  # noqa: SLF001
+
+
+def SaveRecords(filename, record_set=None, extra=None):
+    """Saves the current record set, or the given record set, to a file which
+    can be loaded with LoadRecords.  Any extra picklable data can be saved with
+    the records."""
+    if record_set is None:
+        record_set = recordset
+    data = PickleRecordSet(record_set, extra)
+    with open(filename, "wb") as output:
+        output.write(_SNAPSHOT_MAGIC)
+        output.write(_SNAPSHOT_VERSION.to_bytes(4, "little"))
+        output.write(data)
+
+
+def LoadRecords(filename, record_set=None, lookup=ImportRecord):
+    """Loads the records saved by SaveRecords into the current record set, or
+    the given record set, and returns any extra data saved with them.  The DBDs
+    defining the record types used must have been loaded.  References to records
+    which were not saved are passed to lookup."""
+    with open(filename, "rb") as snapshot:
+        magic = snapshot.read(len(_SNAPSHOT_MAGIC))
+        assert magic == _SNAPSHOT_MAGIC, f"{filename} is not a saved record set"
+        version = int.from_bytes(snapshot.read(4), "little")
+        assert version == _SNAPSHOT_VERSION, (
+            f"{filename} has format version {version}, not {_SNAPSHOT_VERSION}"
+        )
+        data = snapshot.read()
+    loaded, extra = UnpickleRecordSet(data, lookup)
+    if record_set is None:
+        record_set = recordset
+    record_set.Merge(loaded)
+    NotifyUse(loaded)
+    return extra
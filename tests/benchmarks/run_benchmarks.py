@@ -0,0 +1,309 @@
+"""Benchmarks for record creation, validation and output.
+
+Run from the top of the repository with::
+
+    python tests/benchmarks/run_benchmarks.py
+
+Each benchmark reports its throughput in items per second and the peak memory
+allocated while it runs.  The results are compared with a baseline recorded on
+the same machine and the run fails if any benchmark is slower or uses more
+memory than its baseline by more than the given tolerance.  The first run
+records the baseline, use --save to record a new one.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from epicsdbbuilder import (
+    ConstArray,
+    CreateRecords,
+    DatabaseContext,
+    InitialiseDbd,
+    LoadDbdFile,
+    WriteRecords,
+    create_dfanout,
+    create_fanout,
+    records,
+)
+from epicsdbbuilder.recordbase import quote_string
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Number of fields of each type in each synthetic record type.
+SYNTHETIC_FIELDS = 8
+
+
+# Returns the text of a DBD defining record types benchN with fields of the
+# commonest field types, so that validation can be benchmarked without
+# depending on the record types shipped with EPICS base.  The DBD is self
+# contained: only the fields of dbCommon used here are declared.
+def SyntheticDbd(record_types=4, fields=SYNTHETIC_FIELDS):
+    lines = ["menu(menuBench) {"]
+    lines.extend(f'    choice(menuBench{i}, "Choice {i}")' for i in range(16))
+    lines.append("}")
+    for record_type in range(record_types):
+        lines.append(f"recordtype(bench{record_type}) {{")
+        lines.append('    field(NAME, DBF_STRING) { prompt("Record Name") size(61) }')
+        lines.append('    field(DESC, DBF_STRING) { prompt("Descriptor") size(41) }')
+        lines.append('    field(VAL, DBF_DOUBLE) { prompt("Value") }')
+        lines.append('    field(INP, DBF_INLINK) { prompt("Input") }')
+        for i in range(fields):
+            lines.append(f"    field(S{i:02d}, DBF_STRING) {{ size(40) }}")
+            lines.append(f'    field(L{i:02d}, DBF_LONG) {{ prompt("Long") }}')
+            lines.append(f'    field(U{i:02d}, DBF_USHORT) {{ prompt("Short") }}')
+            lines.append(f'    field(D{i:02d}, DBF_DOUBLE) {{ prompt("Double") }}')
+            lines.append(f"    field(M{i:02d}, DBF_MENU) {{ menu(menuBench) }}")
+        lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def LoadSyntheticDbd(directory):
+    dbd_file = os.path.join(directory, "bench.dbd")
+    with open(dbd_file, "w") as dbd:
+        dbd.write(SyntheticDbd())
+    LoadDbdFile(dbd_file)
+
+
+# Each benchmark is passed the number of items to process, does any setup
+# needed and returns a function to be timed.
+
+_RECORD_TYPES = [
+    ("ai", {"DESC": "Input", "SCAN": "1 second", "PREC": 3, "EGU": "mm"}),
+    ("ao", {"DESC": "Output", "DRVH": 10, "DRVL": -10, "OMSL": "supervisory"}),
+    ("bi", {"DESC": "Binary", "ZNAM": "Off", "ONAM": "On"}),
+    ("longout", {"DESC": "Long", "HOPR": 100, "LOPR": 0}),
+    ("calc", {"DESC": "Calc", "CALC": "A+B", "INPA": "X", "INPB": "Y"}),
+]
+
+
+def _CreateRecords(n):
+    for i in range(n):
+        record_type, fields = _RECORD_TYPES[i % len(_RECORD_TYPES)]
+        getattr(records, record_type)(f"REC{i}", **fields)
+
+
+def bench_create_records(n):
+    return lambda: _CreateRecords(n)
+
+
+def bench_create_records_bulk(n):
+    # The same records as create_records, created a record type at a time
+    columns = []
+    for offset, (record_type, fields) in enumerate(_RECORD_TYPES):
+        names = [f"REC{i}" for i in range(offset, n, len(_RECORD_TYPES))]
+        columns.append((record_type, names, fields))
+
+    def run():
+        for record_type, names, fields in columns:
+            CreateRecords(record_type, names, **fields)
+
+    return run
+
+
+def bench_field_validation(n):
+    # Every value is different so nothing is found in the validation cache
+    record = records.bench0("BENCH")
+
+    def run():
+        for i in range(n):
+            field = i % SYNTHETIC_FIELDS
+            setattr(record, f"S{field:02d}", f"String {i}")
+            setattr(record, f"L{field:02d}", i)
+            setattr(record, f"U{field:02d}", i & 0xFFFF)
+            setattr(record, f"D{field:02d}", i * 0.5)
+            setattr(record, f"M{field:02d}", f"Choice {i % 16}")
+
+    return run
+
+
+def bench_create_fanout(n):
+    targets = [records.ai(f"TARGET{i}") for i in range(n)]
+
+    def run():
+        create_fanout("FANOUT", *targets, SCAN="1 second")
+
+    return run
+
+
+def bench_create_dfanout(n):
+    targets = [records.ao(f"TARGET{i}") for i in range(n)]
+
+    def run():
+        create_dfanout("DFANOUT", *targets, OMSL="supervisory")
+
+    return run
+
+
+def bench_const_array(n):
+    record = records.aai("AAI", FTVL="DOUBLE", NELM=n)
+    array = ConstArray([i * 0.25 for i in range(n)])
+
+    def run():
+        record.INP = array
+        record.Format()
+
+    return run
+
+
+def bench_quote_string(n):
+    # Typical field values, a few of which need escaping
+    templates = [
+        "Description of record {}",
+        "@asyn(PORT{0}, 0, 1.0) CHANNEL_{0}",
+        "A+B*{}/(C-D)",
+        '{{"pva": "PV:{}"}}',
+        "Line\tbreak\\{}",
+    ]
+    values = [templates[i % len(templates)].format(i) for i in range(n)]
+
+    def run():
+        for value in values:
+            quote_string(value)
+
+    return run
+
+
+def _bench_write(n, alphabetical):
+    _CreateRecords(n)
+    directory = tempfile.mkdtemp()
+    filename = os.path.join(directory, "bench.db")
+
+    def run():
+        WriteRecords(filename, header="benchmark\n", alphabetical=alphabetical)
+        os.unlink(filename)
+        os.rmdir(directory)
+
+    return run
+
+
+def bench_write_alphabetical(n):
+    return _bench_write(n, True)
+
+
+def bench_write_dbd_order(n):
+    return _bench_write(n, False)
+
+
+BENCHMARKS = {
+    name[len("bench_") :]: function
+    for name, function in globals().items()
+    if name.startswith("bench_")
+}
+
+
+# Runs the benchmark once in a fresh database context, returning the time
+# taken by the benchmark function and the peak memory allocated, if measured.
+def _RunOnce(benchmark, n, trace_memory):
+    with DatabaseContext():
+        run = benchmark(n)
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if trace_memory:
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        else:
+            peak = None
+    return elapsed, peak
+
+
+def RunBenchmarks(n, repeat=3, names=None):
+    """Runs the named benchmarks, or all of them, processing n items each and
+    returns a dictionary of results.  The throughput is computed from the best
+    of repeat runs, peak memory is measured in a separate traced run."""
+    results = {}
+    for name in names or BENCHMARKS:
+        benchmark = BENCHMARKS[name]
+        elapsed = min(_RunOnce(benchmark, n, False)[0] for _ in range(repeat))
+        _, peak = _RunOnce(benchmark, n, True)
+        results[name] = {"throughput": n / elapsed, "peak_memory": peak}
+    return results
+
+
+def CompareResults(results, baseline, tolerance):
+    """Returns a list of regressions of the results from the baseline, which
+    must have been run with the same number of items.  A benchmark missing from
+    the baseline is reported as it could never show a regression."""
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            regressions.append(f"{name}: no baseline, record one with --save")
+            continue
+        if result["throughput"] < expected["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {result['throughput']:.0f}/s, "
+                f"baseline {expected['throughput']:.0f}/s"
+            )
+        if result["peak_memory"] > expected["peak_memory"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: peak memory {result['peak_memory']} bytes, "
+                f"baseline {expected['peak_memory']} bytes"
+            )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "-n", "--items", type=int, default=20000, help="Items per benchmark"
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="Timed runs")
+    parser.add_argument(
+        "-t", "--tolerance", type=float, default=0.25, help="Allowed regression"
+    )
+    parser.add_argument("--baseline", default=BASELINE, help="Baseline file")
+    parser.add_argument("--save", action="store_true", help="Save a new baseline")
+    parser.add_argument("--epics-base", help="EPICS base, default epicscorelibs")
+    parser.add_argument(
+        "--backend",
+        choices=["library", "python"],
+        default="library",
+        help="DBD reader, python does not need the EPICS libraries",
+    )
+    parser.add_argument("benchmarks", nargs="*", help="Benchmarks to run")
+    args = parser.parse_args(argv)
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"Unknown benchmarks {sorted(unknown)}, from {list(BENCHMARKS)}")
+
+    InitialiseDbd(args.epics_base, backend=args.backend)
+    with tempfile.TemporaryDirectory() as directory:
+        LoadSyntheticDbd(directory)
+        results = RunBenchmarks(args.items, args.repeat, args.benchmarks)
+
+    for name, result in results.items():
+        print(
+            f"{name:20} {result['throughput']:12.0f}/s "
+            f"{result['peak_memory'] / 1e6:10.2f} MB"
+        )
+
+    # Timings depend on the machine, so the baseline is never shared: when
+    # there is none these results are recorded as the baseline.
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+    else:
+        with open(args.baseline, "w") as output:
+            json.dump({"items": args.items, "results": results}, output, indent=4)
+            output.write("\n")
+        print(f"Baseline saved in {args.baseline}")
+        return 0
+    if baseline["items"] != args.items:
+        print(f"Baseline is for {baseline['items']} items, not compared")
+        return 0
+    regressions = CompareResults(results, baseline["results"], args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,12 @@
+import os
+
+import pytest
+
+from epicsdbbuilder import InitialiseDbd
+
+
+@pytest.fixture(scope="session")
+def dbd():
+    InitialiseDbd(
+        os.environ.get("EPICS_BASE", None), os.environ.get("EPICS_HOST_ARCH", None)
+    )
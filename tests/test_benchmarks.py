@@ -0,0 +1,22 @@
+from benchmarks import run_benchmarks
+
+
+def test_benchmarks_run(dbd, tmp_path):
+    run_benchmarks.LoadSyntheticDbd(tmp_path)
+    results = run_benchmarks.RunBenchmarks(50, repeat=1)
+    assert set(results) == set(run_benchmarks.BENCHMARKS)
+    assert run_benchmarks.CompareResults(results, results, 0) == []
+
+    slower = {
+        name: {"throughput": 2 * result["throughput"], "peak_memory": 0}
+        for name, result in results.items()
+    }
+    regressions = run_benchmarks.CompareResults(results, slower, 0.25)
+    assert len(regressions) == 2 * len(results)
+
+    # Benchmarks without a baseline are reported
+    missing = dict(results)
+    del missing["quote_string"]
+    assert run_benchmarks.CompareResults(results, missing, 0) == [
+        "quote_string: no baseline, record one with --save"
+    ]
@@ -0,0 +1,71 @@
+import asyncio
+import threading
+
+from epicsdbbuilder import (
+    CountRecords,
+    DatabaseContext,
+    Parameter,
+    PushPrefix,
+    ResetRecords,
+    SetTemplateRecordNames,
+    SimpleRecordNames,
+    records,
+)
+from epicsdbbuilder.recordset import recordset
+
+
+def build(prefix, count):
+    with DatabaseContext(SimpleRecordNames(prefix)) as record_set:
+        Parameter("P", "Same parameter in every context")
+        for i in range(count):
+            records.ai(f"AI{i}")
+        assert CountRecords() == count
+    return record_set
+
+
+def test_contexts_are_isolated(dbd):
+    ResetRecords()
+    outside = records.ai("OUTSIDE")
+
+    record_set = build("A", 3)
+    assert [r.name for r in record_set.Records()] == ["A:AI0", "A:AI1", "A:AI2"]
+    assert record_set.HeaderLines() == ["#% macro, P, Same parameter in every context"]
+
+    # The original context is restored afterwards
+    assert recordset.Records() == [outside]
+    ResetRecords()
+
+
+def test_threads(dbd):
+    results = {}
+
+    def run(prefix):
+        results[prefix] = build(prefix, 100)
+
+    threads = [threading.Thread(target=run, args=(p,)) for p in "ABCD"]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for prefix, record_set in results.items():
+        assert record_set.CountRecords() == 100
+        assert {r.name.split(":")[0] for r in record_set.Records()} == {prefix}
+
+
+def test_asyncio_tasks(dbd):
+    async def run(prefix):
+        with DatabaseContext() as record_set:
+            SetTemplateRecordNames()
+            PushPrefix(prefix)
+            for i in range(10):
+                records.ai(f"AI{i}")
+                await asyncio.sleep(0)
+        return record_set
+
+    async def main():
+        return await asyncio.gather(run("X"), run("Y"))
+
+    x, y = asyncio.run(main())
+    assert x.Records()[0].name == "$(DEVICE):X:AI0"
+    assert y.Records()[9].name == "$(DEVICE):Y:AI9"
+    assert x.HeaderLines() == y.HeaderLines() == ["#% macro, DEVICE, Device name"]
@@ -0,0 +1,299 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from epicsdbbuilder import (
+    DatabaseContext,
+    DBDatabase,
+    EnableProfiling,
+    LoadDbdFile,
+    LoadDbdFiles,
+    ProfilingData,
+    ResetProfiling,
+    records,
+)
+from epicsdbbuilder.dbd import RecordTypes, ValidateDbField
+
+
+def test_field_info(dbd):
+    validate = records.ai._validate
+    fields = validate.Fields()
+    assert list(fields) == sorted(fields, key=lambda field: fields[field].index)
+    names = validate.FieldNames()
+    ranks = validate.FieldRanks()
+    order = sorted(range(len(names)), key=ranks.__getitem__)
+    assert [names[i] for i in order] == sorted(names)
+
+    scan = validate.GetFieldInfo("SCAN")
+    assert scan.dbf_type == "DBF_MENU"
+    assert "I/O Intr" in scan.choices
+    assert "Soft Channel" in validate.GetFieldInfo("DTYP").choices
+    assert validate.GetFieldInfo("DESC").size == 41
+    assert validate.GetFieldInfo("PREC").size is None
+
+    with pytest.raises(AttributeError):
+        validate.GetFieldInfo("NAME")
+    with pytest.raises(AttributeError):
+        validate.GetFieldInfo("NOTAFIELD")
+
+
+def test_field_validation(dbd):
+    validate = records.ai._validate
+    validate.ValidFieldValue("SCAN", "1 second")
+    validate.ValidFieldValue("PREC", 3)
+    with pytest.raises(AssertionError):
+        validate.ValidFieldValue("SCAN", "2 weeks")
+    with pytest.raises(AssertionError):
+        validate.ValidFieldValue("DESC", "x" * 41)
+
+
+# A selection of values which exercise the different parsing rules
+VERIFY_VALUES = [
+    "",
+    " ",
+    "0",
+    "-1",
+    "+5",
+    " 12 ",
+    "010",
+    "09",
+    "0x1F",
+    "0x",
+    "-0",
+    "255",
+    "-256",
+    "65536",
+    "-2147483649",
+    "18446744073709551616",
+    "9223372036854775808+",
+    "-18446744073709551616x",
+    "70000x",
+    "1.5",
+    ".5",
+    "1e",
+    "1e400",
+    "1e-400",
+    "1e-310",
+    "1e400x",
+    "1e-400 z",
+    "0x1p3",
+    "0x1p-1030",
+    "-0x.8p-1070",
+    "0x1.0000000000001p-1030",
+    "0x1p-1080",
+    "0x0p0",
+    "nan",
+    "-Infinity",
+    "abc",
+    "12abc",
+    "A+1",
+    "(",
+    "$(MACRO)",
+    "Passive",
+    "1 second",
+    "Soft Channel",
+    "x" * 41,
+    "€" * 14,
+]
+
+
+def test_verify_matches_dbverify(dbd, monkeypatch):
+    monkeypatch.setattr(ValidateDbField, "cross_check", True)
+    for record_type in records.GetRecords():
+        validate = getattr(records, record_type)._validate
+        validate.Invalidate()
+        for field in validate.Fields():
+            if field != "NAME":
+                for value in VERIFY_VALUES:
+                    try:
+                        validate.ValidFieldValue(field, value)
+                    except AssertionError as error:
+                        assert "dbVerify gives" not in str(error)
+
+
+def test_validation_cache(dbd, tmp_path):
+    validate = records.ao._validate
+    validate.Invalidate()
+    hits, misses, _, _ = validate.CacheInfo()
+    validate.ValidFieldValue("SCAN", "I/O Intr")
+    validate.ValidFieldValue("SCAN", "I/O Intr")
+    validate.ValidFieldValue("PREC", 3)
+    assert validate.CacheInfo()[:2] == (hits + 1, misses + 2)
+    assert validate.CacheInfo().currsize == 2
+
+    # Loading a new device type must invalidate the cached result
+    with pytest.raises(AssertionError):
+        validate.ValidFieldValue("DTYP", "Cache Test")
+    dbd_file = tmp_path / "cache_test.dbd"
+    dbd_file.write_text('device(ao, CONSTANT, devAoCacheTest, "Cache Test")\n')
+    LoadDbdFile(str(dbd_file))
+    validate.ValidFieldValue("DTYP", "Cache Test")
+
+
+def test_incremental_extraction(dbd, tmp_path):
+    dbd_file = tmp_path / "extract_test.dbd"
+    dbd_file.write_text('device(bo, CONSTANT, devBoExtractTest, "Extract Test")\n')
+    total = len(records.GetRecords())
+    ResetProfiling()
+    EnableProfiling()
+    try:
+        LoadDbdFile(str(dbd_file))
+        records.bo._validate.ValidFieldValue("DTYP", "Extract Test")
+    finally:
+        EnableProfiling(False)
+
+    # Only the device fields of the record types already extracted are read
+    calls = ProfilingData()["library_calls"]
+    assert "dbGetFieldTypeString" not in calls
+    assert "dbVerify" not in calls
+    assert calls["dbGetFieldName"]["calls"] < 20 * total
+
+
+def test_load_dbd_files(dbd, tmp_path):
+    support = tmp_path / "support"
+    support.mkdir()
+    (support / "main.dbd").write_text('include "extra.dbd"\n')
+    (support / "extra.dbd").write_text(
+        'device(bi, CONSTANT, devBiLoadTest, "Load Test")\n'
+    )
+    names = [f"Thread Test {n}" for n in range(8)]
+    for n, name in enumerate(names):
+        (support / f"thread{n}.dbd").write_text(
+            f'device(mbbi, CONSTANT, devMbbiThread{n}, "{name}")\n'
+        )
+
+    # Includes are found relative to the DBD without changing directory
+    cwd = os.getcwd()
+    LoadDbdFiles([str(support / "main.dbd")])
+    assert os.getcwd() == cwd
+    records.bi._validate.ValidFieldValue("DTYP", "Load Test")
+
+    dbd_files = [str(support / f"thread{n}.dbd") for n in range(8)]
+    with ThreadPoolExecutor(4) as executor:
+        list(executor.map(LoadDbdFile, dbd_files))
+    for name in names:
+        records.mbbi._validate.ValidFieldValue("DTYP", name)
+
+
+def test_independent_databases(dbd, tmp_path):
+    dbd_file = tmp_path / "variant.dbd"
+    dbd_file.write_text('device(ai, CONSTANT, devAiVariant, "Variant")\n')
+    variant, plain = DBDatabase(), DBDatabase()
+    variant.InitialiseDbd()
+    plain.InitialiseDbd()
+    variant.LoadDbdFile(str(dbd_file))
+
+    def build(database):
+        with DatabaseContext(database=database) as record_set:
+            assert records.ai is database.records.ai
+            try:
+                records.ai("AI", DTYP="Variant")
+            except AssertionError:
+                return None
+            return record_set.CountRecords()
+
+    with ThreadPoolExecutor(2) as executor:
+        assert list(executor.map(build, [variant, plain])) == [1, None]
+    assert "Variant" in variant.records.ai._validate.GetFieldInfo("DTYP").choices
+    assert "Variant" not in records.ai._validate.GetFieldInfo("DTYP").choices
+
+
+def test_record_types_created_on_use(dbd):
+    types = RecordTypes()
+    types._PublishRecordType(None, "longout")
+    assert "longout" in types
+    assert types.GetRecords() == ["longout"]
+    assert "longout" not in vars(types)
+
+    longout = types.longout
+    assert longout.__name__ == "longout"
+    assert types.longout is longout
+    assert longout.ValidFieldName("DRVH")
+
+    with pytest.raises(AttributeError):
+        types.calc  # noqa: B018
+
+
+WARM_START = """
+import sys
+from epicsdbbuilder import InitialiseDbd, mydbstatic, records
+InitialiseDbd(cache_dir=sys.argv[1])
+records.calc("CALC", SCAN="1 second", PREC=3)
+try:
+    records.ai("AI", SCAN="2 weeks")
+except AssertionError:
+    pass
+else:
+    raise AssertionError("Invalid SCAN accepted")
+print(mydbstatic._libdb is None)
+# CALC expressions can only be checked by the library, which is loaded now
+records.calc("CALC2", CALC="A+B")
+try:
+    records.calc("CALC3", CALC="A+(")
+except AssertionError:
+    pass
+else:
+    raise AssertionError("Invalid CALC accepted")
+print(mydbstatic._libdb is None)
+"""
+
+
+def test_dbd_cache(tmp_path):
+    def run():
+        result = subprocess.run(
+            [sys.executable, "-c", WARM_START, str(tmp_path)],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        return result.stdout.strip()
+
+    # The first run populates the cache, the second shouldn't need libdbCore
+    # until a CALC expression has to be checked
+    assert run() == "False\nFalse"
+    assert len(list(tmp_path.glob("dbd-*.json"))) == 1
+    assert run() == "True\nFalse"
+
+
+MATCHES_LIBRARY = """
+from epicsdbbuilder import InitialiseDbd, dbd
+from epicsdbbuilder.dbdparser import DbdDefinitions
+InitialiseDbd()
+definitions = DbdDefinitions(dbd._PATH_SEPARATOR)
+definitions.ReadDbd(".", "base.dbd", dbd.current_database.get()._IncludePath())
+library = {
+    record_type: [tuple(field) for field in fields.values()]
+    for record_type, fields in dbd._ExtractRecordTypes(dbd.DBEntry()).items()
+}
+print(definitions.RecordFields() == library)
+"""
+
+
+PYTHON_BACKEND = """
+from epicsdbbuilder import InitialiseDbd, mydbstatic, records
+InitialiseDbd(backend="python")
+records.calc("CALC", CALC="A+B", SCAN="1 second", DTYP="Soft Channel")
+try:
+    records.ai("AI", SCAN="2 weeks")
+except AssertionError:
+    pass
+else:
+    raise AssertionError("Invalid SCAN accepted")
+print(mydbstatic._libdb is None)
+"""
+
+
+@pytest.mark.parametrize(
+    "script", [MATCHES_LIBRARY, PYTHON_BACKEND], ids=["matches_library", "build"]
+)
+def test_python_backend(script):
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert result.stdout.strip() == "True"
@@ -0,0 +1,102 @@
+import io
+
+import pytest
+
+from epicsdbbuilder import (
+    ConstArray,
+    DatabaseContext,
+    ImportRecord,
+    ReadRecords,
+    records,
+)
+from epicsdbbuilder.recordset import RecordSet
+
+
+def _Output(record_set):
+    output = io.StringIO()
+    record_set.Print(output, True)
+    return output.getvalue()
+
+
+def test_round_trip(dbd, tmp_path):
+    with DatabaseContext() as original:
+        original.AddHeaderLine("#% macro, P, Device prefix")
+        ai = records.ai("$(P):AI", DESC='Quoted "value"\t', SCAN="1 second")
+        ai.add_comment("A comment")
+        ai.add_metadata("archiver 10 Monitor")
+        ai.add_alias("$(P):ALIAS")
+        ai.add_info("Q:group", {"grp": {"+id": "x", "value": {"+channel": "VAL"}}})
+        ai.add_info("autosaveFields", "VAL")
+        records.calc("CALC", INPA=ai.VAL, INPB=ai.DESC, CALC="A+B")
+        records.lsi("LSI", INP=ConstArray(["a", "b"]))
+        records.ai("JSON", INP={"pva": {"pv": "OTHER", "monitor": True}})
+        ImportRecord("EXTERNAL").add_alias("EXTERNAL:ALIAS")
+
+    expected = _Output(original)
+    filename = tmp_path / "test.db"
+    filename.write_text(expected)
+
+    record_set = RecordSet()
+    ReadRecords(filename, record_set)
+    assert _Output(record_set) == expected
+    assert record_set.LookupRecord("CALC").INPA.Value() == "$(P):AI.VAL"
+
+
+def test_relaxed_syntax(dbd):
+    text = """\
+# Header comment
+
+include_not = 1
+"""
+    with DatabaseContext(), pytest.raises(AssertionError, match="<file>:3:"):
+        ReadRecords(io.StringIO(text))
+
+    text = 'record(ai, "AI") {\n}\nfield(DESC, "x")\n'
+    with (
+        DatabaseContext(),
+        pytest.raises(AssertionError, match="<file>:3: field outside record"),
+    ):
+        ReadRecords(io.StringIO(text))
+
+    text = """\
+# Header comment
+
+grecord(ao, AO) {
+    field(DESC, "Octal \\101 and hex \\x42")
+    field(OUT, {ca: {pv: "REMOTE", retry: 3}})
+    # Inside the record
+}
+record("*", AO) { field(DRVH, 10) }
+alias(AO, AO2)
+record(ai, $(P)AI) {
+    field(PREC, $(PREC=3))
+    field(INP, ${P}AO:${IN=$(DEFAULT)})
+}
+"""
+    with DatabaseContext() as record_set:
+        ReadRecords(io.StringIO(text))
+        ao = record_set.LookupRecord("AO")
+        assert ao.DESC.Value() == "Octal A and hex B"
+        assert ao.OUT.Value() == {"ca": {"pv": "REMOTE", "retry": 3}}
+        assert ao.DRVH.Value() == "10"
+        assert record_set.HeaderLines() == ["# Header comment"]
+        assert ao.Format().startswith('\n# Inside the record\nrecord(ao, "AO")')
+        assert 'alias("AO2")' in ao.Format()
+        ai = record_set.LookupRecord("$(P)AI")
+        assert ai.PREC.Value() == "$(PREC=3)"
+        assert ai.INP.Value() == "${P}AO:${IN=$(DEFAULT)}"
+
+
+def test_invalid_field(dbd):
+    text = 'record(ai, "AI") {\n    field(SCAN, "Not a scan")\n}\n'
+    with DatabaseContext(), pytest.raises(AssertionError, match="<file>:2: AI:"):
+        ReadRecords(io.StringIO(text))
+
+
+def test_trailing_white_space(dbd):
+    text = 'record(ai, "AI") { \t\n  field(DESC, "Text")  \n  field(EGU, mm)\t\n} \n'
+    with DatabaseContext() as record_set:
+        ReadRecords(io.StringIO(text))
+        ai = record_set.LookupRecord("AI")
+        assert ai.DESC.Value() == "Text"
+        assert ai.EGU.Value() == "mm"
@@ -0,0 +1,52 @@
+from epicsdbbuilder import (
+    CP,
+    MS,
+    PP,
+    DatabaseContext,
+    ImportRecord,
+    LinkEdge,
+    LinkGraph,
+    records,
+)
+
+
+def test_link_graph(dbd):
+    with DatabaseContext():
+        external = ImportRecord("EXTERNAL")
+        source = records.ai("SOURCE", INP=MS(external.VAL))
+        calc = records.calc("CALC", INPA=CP(source), INPB="SOURCE.EGU NPP")
+        output = records.ao("OUTPUT", DOL=calc, OUT=PP(external))
+        calc.FLNK = output
+        source.FLNK = "@not a record"
+        graph = LinkGraph()
+
+    assert graph.Links("CALC") == [
+        LinkEdge("CALC", "INPA", "SOURCE", None, ("CP",)),
+        LinkEdge("CALC", "INPB", "SOURCE", "EGU", ("NPP",)),
+        LinkEdge("CALC", "FLNK", "OUTPUT", None, ()),
+    ]
+    assert [edge.source for edge in graph.LinksTo("SOURCE")] == ["CALC", "CALC"]
+    assert graph.Unresolved() == [
+        LinkEdge("SOURCE", "INP", "EXTERNAL", "VAL", ("MS",)),
+        LinkEdge("OUTPUT", "OUT", "EXTERNAL", None, ("PP",)),
+    ]
+    assert graph.Processes("SOURCE") == ["CALC"]
+    assert graph.ProcessingCycles() == []
+    assert graph.ChainDepths()["SOURCE"] == 4
+    assert graph.ChainDepth() == 4
+
+
+def test_processing_cycles(dbd):
+    with DatabaseContext() as record_set:
+        chain = [records.calc(f"CALC{i}") for i in range(5000)]
+        for i in range(len(chain) - 1):
+            chain[i].FLNK = chain[i + 1]
+        loop = records.calc("LOOP")
+        loop.FLNK = loop
+        chain[-1].FLNK = chain[0]
+        graph = LinkGraph(record_set)
+
+    cycles = sorted(graph.ProcessingCycles(), key=len)
+    assert cycles[0] == ["LOOP"]
+    assert sorted(cycles[1]) == sorted(record.name for record in chain)
+    assert graph.ChainDepth() == 5000
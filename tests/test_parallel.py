@@ -0,0 +1,87 @@
+import functools
+import io
+import multiprocessing
+
+import pytest
+
+from epicsdbbuilder import (
+    BuildParallel,
+    ImportRecord,
+    Parameter,
+    PushPrefix,
+    ResetRecords,
+    SetRecordNames,
+    SimpleRecordNames,
+    records,
+)
+from epicsdbbuilder.recordset import recordset
+
+
+def build_inputs():
+    recordset.AddHeaderLine("# header")
+    records.ai("INPUT", DESC="Input", INP=records.ai("RAW")("CP", "MS"))
+    return "inputs"
+
+
+def build_outputs():
+    recordset.AddHeaderLine("# outputs")
+    output = records.ao("OUTPUT", DOL=ImportRecord("INPUT"), OMSL="closed_loop")
+    output.add_alias("ALIAS")
+    output.add_info("autosaveFields", "VAL")
+    output.add_comment("A comment")
+    return output.name
+
+
+def build_serial():
+    return [build_inputs(), build_outputs()]
+
+
+def print_records():
+    output = io.StringIO()
+    recordset.Print(output, True)
+    return output.getvalue()
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_build_parallel(dbd, method):
+    ResetRecords()
+    names = SetRecordNames(SimpleRecordNames("TEST"))
+    build_serial()
+    expected = print_records()
+
+    ResetRecords()
+    results = BuildParallel(
+        [build_inputs, build_outputs],
+        max_workers=2,
+        mp_context=multiprocessing.get_context(method),
+    )
+    assert results == ["inputs", "TEST:OUTPUT"]
+    assert print_records() == expected
+    ResetRecords()
+    SetRecordNames(names)
+
+
+def test_build_parallel_duplicates(dbd):
+    ResetRecords()
+    with pytest.raises(AssertionError, match="already defined"):
+        BuildParallel([build_inputs, build_inputs])
+    assert recordset.CountRecords() == 0
+
+
+def build_device(name):
+    PushPrefix("DEVICE")
+    return records.ai(name, DESC=Parameter("DEVICE", "Device name")).name
+
+
+def test_build_parallel_isolated(dbd):
+    # Builders run by the same worker don't see each other's parameters or
+    # record name prefixes
+    ResetRecords()
+    names = SetRecordNames(SimpleRecordNames("TEST"))
+    results = BuildParallel(
+        [functools.partial(build_device, "A"), functools.partial(build_device, "B")],
+        max_workers=1,
+    )
+    assert results == ["TEST:DEVICE:A", "TEST:DEVICE:B"]
+    ResetRecords()
+    SetRecordNames(names)
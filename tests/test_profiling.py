@@ -0,0 +1,68 @@
+import io
+import json
+
+from epicsdbbuilder import (
+    CreateRecords,
+    DatabaseContext,
+    DeferValidation,
+    EnableProfiling,
+    ProfilingData,
+    ProfilingReport,
+    ResetProfiling,
+    WriteProfilingData,
+    records,
+)
+from epicsdbbuilder.recordbase import Record
+
+
+def test_profiling(dbd, tmp_path):
+    init = Record.__init__
+    ResetProfiling()
+    EnableProfiling()
+    try:
+        with DatabaseContext() as record_set:
+            for i in range(5):
+                records.ai(f"AI{i}", DESC="Profiled")
+            records.calc("CALC", CALC="A+B+12345")
+            record_set.Print(io.StringIO(), True)
+    finally:
+        EnableProfiling(False)
+    assert Record.__init__ is init
+
+    data = ProfilingData()
+    assert data["phases"]["RecordName"]["calls"] == 6
+    assert data["phases"]["validation"]["calls"] == 6
+    assert data["phases"]["Print"]["calls"] == 1
+    assert data["record_types"]["ai"]["create"]["calls"] == 5
+    assert data["record_types"]["calc"]["format"]["calls"] == 1
+    assert data["library_calls"]["dbVerify"]["calls"] >= 1
+    assert "dbVerify" in ProfilingReport()
+
+    # Nothing more is recorded once profiling is disabled
+    records.ai("AI", DESC="Not profiled")
+    assert ProfilingData() == data
+
+    WriteProfilingData(tmp_path / "profile.json")
+    assert json.loads((tmp_path / "profile.json").read_text()) == data
+    ResetProfiling()
+    assert ProfilingData()["phases"] == {}
+
+
+def test_profiling_bulk(dbd):
+    ResetProfiling()
+    EnableProfiling()
+    try:
+        with DatabaseContext():
+            CreateRecords(records.ai, ["AI0", "AI1", "AI2"], DESC=["A", "B", "A"])
+            DeferValidation()
+            records.ao("AO", DESC="Deferred")
+            DeferValidation(False)
+    finally:
+        EnableProfiling(False)
+
+    data = ProfilingData()
+    assert data["record_types"]["ai"]["create"]["calls"] == 3
+    # Two distinct values when created, then all three values in the batch
+    assert data["phases"]["validation"]["calls"] == 5
+    assert data["phases"]["batch validation"]["calls"] == 1
+    ResetProfiling()
@@ -1,6 +1,6 @@
 import unittest
 
-from epicsdbbuilder.recordbase import quote_string
+from epicsdbbuilder.recordbase import quote_char, quote_string
 
 
 class TestQuoteString(unittest.TestCase):
@@ -12,3 +12,12 @@ class TestQuoteString(unittest.TestCase):
 
     def test_string_with_escaping(self):
         self.assertEqual('"A\\"C"', quote_string('A"C'))
+
+    def test_matches_quote_char(self):
+        # Every ASCII character and a few others, alone and in a string
+        chars = [chr(i) for i in range(128)] + ["é", "☃", "\U0001f600"]
+        for ch in chars:
+            self.assertEqual(f'"{quote_char(ch)}"', quote_string(ch))
+        value = "".join(chars) * 2
+        expected = '"' + "".join(map(quote_char, value)) + '"'
+        self.assertEqual(expected, quote_string(value))
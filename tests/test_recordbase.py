@@ -0,0 +1,83 @@
+import pytest
+
+from epicsdbbuilder import CreateRecords, DatabaseContext, Parameter, records
+
+
+def test_compact_record(dbd):
+    with DatabaseContext():
+        r = records.ai("AI", DESC="Compact")
+        assert not hasattr(r, "__dict__")
+        assert r.DESC.Value() == "Compact"
+
+        r.address = "@input"
+        assert r.INP.Value() == "@input"
+        del r.address
+        with pytest.raises(KeyError):
+            r.INP.Value()
+        r.DESC = None
+        assert r.Format() == '\nrecord(ai, "AI")\n{\n}\n'
+
+        with pytest.raises(AttributeError):
+            records.calc("CALC").address = "no INP or OUT"
+        with pytest.raises(AttributeError):
+            r.NOTAFIELD = Parameter("P")
+
+
+def test_assign_none_to_unknown_field(dbd):
+    # Assigning None is ignored even when the name is not a field
+    with DatabaseContext():
+        r = records.ai("AI", NOTAFIELD=None, DESC=None)
+        r.NOTAFIELD = None
+        assert r.Format() == '\nrecord(ai, "AI")\n{\n}\n'
+
+
+def test_create_records(dbd):
+    names = [f"AI{n}" for n in range(4)]
+    with DatabaseContext() as record_set:
+        created = CreateRecords(
+            records.ai,
+            names,
+            DESC=[f"Channel {n}" for n in range(4)],
+            SCAN="1 second",
+            PREC=(1, None, 3, 4),
+            address="@input",
+        )
+        expected = records.ai("AI", DESC="Channel 0", SCAN="1 second", PREC=1)
+        expected.address = "@input"
+        assert created[0].Format() == expected.Format().replace('"AI"', '"AI0"')
+        assert "PREC" not in created[1].Format()
+        assert record_set.FindRecords("AI") == [expected, *created]
+
+        # Nothing is created if any value is invalid or any name is in use
+        with pytest.raises(AssertionError, match="B2: Can't write 'bad'"):
+            CreateRecords("ai", ["B1", "B2"], SCAN=["1 second", "bad"])
+        with pytest.raises(AssertionError, match="already defined"):
+            CreateRecords("ai", ["B1", "AI0"])
+        with pytest.raises(AssertionError, match="2 values given"):
+            CreateRecords("ai", ["B1"], PREC=[1, 2])
+        assert record_set.CountRecords() == 5
+
+
+def test_create_records_on_use(dbd, monkeypatch):
+    calls = []
+
+    def on_use(*args):
+        calls.append(args)
+
+    monkeypatch.setattr(records.ai, "_on_use", on_use)
+    with DatabaseContext():
+        record = records.ai("AI")
+        created = CreateRecords("ai", ["AI1", "AI2"])
+        assert calls == [(record, record), *((r, r) for r in created)]
+
+        # Hooks are not called when the records can't be created
+        with pytest.raises(AssertionError, match="already defined"):
+            CreateRecords("ai", ["AI3", "AI4", "AI1"])
+        assert len(calls) == 3
+
+
+def test_create_records_from_array(dbd):
+    numpy = pytest.importorskip("numpy")
+    with DatabaseContext():
+        created = CreateRecords("ao", ["AO1", "AO2"], DRVH=numpy.array([1.5, 2]))
+        assert [r.DRVH.Value() for r in created] == [1.5, 2.0]
@@ -0,0 +1,170 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+from epicsdbbuilder import (
+    CountRecordsByPrefix,
+    CountRecordsByType,
+    DatabaseContext,
+    DeferValidation,
+    FindRecords,
+    LookupRecord,
+    ResetRecords,
+    WriteRecords,
+    WriteShardedRecords,
+    records,
+)
+from epicsdbbuilder.recordset import recordset
+
+
+def test_buffer_size_does_not_change_output(dbd):
+    ResetRecords()
+    recordset.AddHeaderLine("# header")
+    recordset.AddBodyLine("# body")
+    for i in range(20):
+        r = records.ai(f"AI{i}", DESC=f"Record {i}", SCAN="1 second", PREC=i % 5)
+        r.add_comment("comment")
+        r.add_alias(f"ALIAS{i}")
+        r.add_info("autosaveFields", "VAL")
+
+    outputs = []
+    for buffer_size in [1, 100, 1 << 20]:
+        output = io.StringIO()
+        recordset.Print(output, True, buffer_size)
+        outputs.append(output.getvalue())
+    assert outputs[0] == outputs[1] == outputs[2]
+    assert outputs[0].startswith("# header\n\n# body\n\n# comment\nrecord(ai,")
+    ResetRecords()
+
+
+def test_incremental_write(dbd, tmp_path, monkeypatch):
+    ResetRecords()
+    records.ai("AI", DESC="First")
+    db_file = tmp_path / "test.db"
+
+    # The Disclaimer timestamp doesn't count as a change
+    monkeypatch.setattr("time.strftime", lambda format: "Then")
+    assert WriteRecords(db_file, incremental=True)
+    monkeypatch.setattr("time.strftime", lambda format: "Now")
+    assert not WriteRecords(db_file, incremental=True)
+    assert "generated on Then." in db_file.read_text()
+
+    records.ai("AI2")
+    assert WriteRecords(db_file, incremental=True)
+    assert "generated on Now." in db_file.read_text()
+    assert "AI2" in db_file.read_text()
+
+    # A missing output file is always written
+    db_file.unlink()
+    assert WriteRecords(db_file, incremental=True)
+    assert db_file.exists()
+
+    # Changes made to the file by a normal write are detected
+    records.ai("AI3")
+    assert WriteRecords(db_file)
+    assert "AI3" in db_file.read_text()
+    ResetRecords()
+    records.ai("AI", DESC="First")
+    records.ai("AI2")
+    assert WriteRecords(db_file, incremental=True)
+    assert "AI3" not in db_file.read_text()
+    ResetRecords()
+
+
+def test_deferred_validation(dbd):
+    with DatabaseContext() as record_set:
+        DeferValidation()
+        for i in range(3):
+            records.ai(f"AI{i}", PREC="bad", SCAN="1 second")
+        records.ao("AO", DRVH="1e999", OMSL="supervisory")
+
+        with pytest.raises(AssertionError) as error:
+            record_set.Print(io.StringIO(), True)
+        lines = str(error.value).split("\n")
+        assert lines[0] == "4 invalid fields:"
+        assert "AI2.PREC: can't write 'bad': Not a valid integer" in lines
+        assert "AO.DRVH: can't write '1e999': Number too large for field type" in lines
+
+        # Fixing the values allows the records to be written
+        for i in range(3):
+            LookupRecord(f"AI{i}").PREC = 3
+        LookupRecord("AO").DRVH = 10
+        DeferValidation(False)
+        with pytest.raises(AssertionError):
+            LookupRecord("AO").DRVL = "bad"
+
+
+def test_find_records(dbd):
+    with DatabaseContext() as record_set:
+        # Published out of order to check the index is sorted when queried
+        for name in ["B:TEMP", "A:TEMP", "A:SUB:SET", "A:SUB:GET", "A", "C:X"]:
+            records.ao(name) if "SET" in name else records.ai(name)
+
+        def names(records):
+            return [record.name for record in records]
+
+        assert names(FindRecords("A:")) == ["A:SUB:GET", "A:SUB:SET", "A:TEMP"]
+        assert names(FindRecords(pattern="*:TEMP")) == ["A:TEMP", "B:TEMP"]
+        assert names(FindRecords("A:", pattern="A:SUB:*")) == ["A:SUB:GET", "A:SUB:SET"]
+        assert names(FindRecords("B:", pattern="A*")) == []
+        assert names(FindRecords(record_type="ao")) == ["A:SUB:SET"]
+        assert names(FindRecords("A:S", record_type="ai")) == ["A:SUB:GET"]
+        assert FindRecords("D") == []
+
+        assert CountRecordsByType() == {"ai": 5, "ao": 1}
+        assert CountRecordsByPrefix() == {"A": 4, "B": 1, "C": 1}
+        assert CountRecordsByPrefix(depth=2) == {
+            "A": 1,
+            "A:SUB": 2,
+            "A:TEMP": 1,
+            "B:TEMP": 1,
+            "C:X": 1,
+        }
+
+        records.ai("A:NEW")
+        assert names(record_set.FindRecords("A:N")) == ["A:NEW"]
+        assert record_set.CountRecordsByPrefix()["A"] == 5
+
+
+def test_sharded_output(dbd, tmp_path):
+    with DatabaseContext() as record_set:
+        record_set.AddHeaderLine("#% macro, P, Prefix")
+        record_set.AddBodyLine('alias("A:0", "FIRST")')
+        for prefix in "BA":
+            for i in range(5):
+                records.ai(f"{prefix}:{i}", DESC="x" * i)
+        expected = io.StringIO()
+        record_set.Print(expected, True)
+
+        index = tmp_path / "ioc.db"
+        shards = WriteShardedRecords(index, header="test\n", max_records=3)
+        assert [os.path.basename(shard) for shard in shards] == [
+            f"ioc-00{i}.db" for i in range(1, 5)
+        ]
+        body = "".join(
+            Path(shard).read_text().removeprefix("# test\n") for shard in shards
+        )
+        assert expected.getvalue().endswith(body)
+        assert index.read_text() == (
+            "# test\n#% macro, P, Prefix\n\n"
+            + "".join(f'include "ioc-00{i}.db"\n' for i in range(1, 5))
+            + '\nalias("A:0", "FIRST")\n'
+        )
+
+        shards = WriteShardedRecords(index, header="test\n", by_prefix=True)
+        assert len(shards) == 2
+        assert "B:" not in Path(shards[0]).read_text()
+        # The shards left over from the first write are removed
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            "ioc-001.db",
+            "ioc-002.db",
+            "ioc.db",
+        ]
+
+        size = len(LookupRecord("A:4").Format(True)) * 2
+        shards = WriteShardedRecords(index, header="test\n", max_size=size)
+        sizes = [len(Path(shard).read_text()) - len("# test\n") for shard in shards]
+        assert len(shards) == 5
+        assert max(sizes) <= size
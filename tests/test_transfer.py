@@ -0,0 +1,77 @@
+import io
+import pickle
+
+import pytest
+
+from epicsdbbuilder import (
+    CP,
+    MS,
+    PP,
+    ConstArray,
+    DatabaseContext,
+    ImportRecord,
+    LoadRecords,
+    Parameter,
+    SaveRecords,
+    records,
+)
+
+
+def _Output(record_set):
+    output = io.StringIO()
+    record_set.Print(output, True)
+    return output.getvalue()
+
+
+def test_save_and_load(dbd, tmp_path, monkeypatch):
+    filename = tmp_path / "records.pkl"
+    with DatabaseContext() as original:
+        device = Parameter("DEVICE", "Device name")
+        external = ImportRecord("EXTERNAL")
+        ai = records.ai("AI", DESC=device, INP=PP(MS(external.VAL)))
+        ai.add_alias("AI:ALIAS")
+        ai.add_comment("Comment")
+        ai.add_metadata("Metadata")
+        ai.add_info("autosaveFields", "VAL")
+        records.calc("CALC", INPA=CP(ai), INPB=ai.DESC, CALC="A+B")
+        records.lsi("LSI", INP=ConstArray(["a", device]))
+        original.AddBodyLine('alias("EXTERNAL", "EXTERNAL:ALIAS")')
+        SaveRecords(filename, extra={"ai": ai})
+    expected = _Output(original)
+
+    with DatabaseContext() as loaded:
+        extra = LoadRecords(filename)
+        assert _Output(loaded) == expected
+        ai = loaded.LookupRecord("AI")
+        assert extra["ai"] is ai
+        calc = loaded.LookupRecord("CALC")
+        assert calc.INPA.Value().record is ai
+        assert calc.INPA.Value().specifiers == ("CP",)
+        assert isinstance(ai.INP.Value().record, ImportRecord)
+
+        # Loading the same records again is an error, and the records which
+        # were not loaded are not reported as used
+        used = []
+        monkeypatch.setattr(records.ai, "_on_use", used.append)
+        with pytest.raises(AssertionError, match="already defined"):
+            LoadRecords(filename)
+        assert used == []
+
+    with DatabaseContext():
+        LoadRecords(filename)
+        assert [record.name for record in used] == ["AI"]
+
+
+def test_not_a_snapshot(dbd, tmp_path):
+    filename = tmp_path / "records.pkl"
+    filename.write_bytes(b"record(ai, AI)\n")
+    with DatabaseContext(), pytest.raises(AssertionError, match="not a saved"):
+        LoadRecords(filename)
+
+
+def test_pickle_record(dbd):
+    # Records pickled on their own are loaded as references by name
+    with DatabaseContext():
+        record = pickle.loads(pickle.dumps(records.ai("AI")))
+        assert isinstance(record, ImportRecord)
+        assert record.name == "AI"